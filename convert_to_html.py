@@ -5,14 +5,66 @@ Convert Embrix O2X Markdown Documentation to HTML
 
 import re
 import os
+import sys
+import json
+import time
+import argparse
+import ast
+import posixpath
+import shutil
+import subprocess
+import tempfile
+import contextlib
+import struct
+import string
+import io
+import random
+import difflib
+import statistics
+import tracemalloc
+import sqlite3
+import importlib
+import importlib.util
+import hashlib
+import gzip
+import unicodedata
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from html import escape, unescape
+from html.parser import HTMLParser
 
-# CSS template for all HTML pages
-CSS_TEMPLATE = """
+try:
+    from fontTools import subset as font_subset
+except ImportError:  # Optional: --fonts local copies whole font files without it
+    font_subset = None
+
+# Local cache for build data that is expensive to recompute between runs
+CACHE_DIR = Path(".build-cache")
+IMAGE_SIZE_CACHE_FILE = CACHE_DIR / "image-sizes.json"
+
+# Navigation links for all pages - will be at top of every page
+NAV_LINKS = [
+    ("Home", "index.html"),
+    ("Guide Index", "guide-index.html"),
+    ("Part 1-5", "guide-index.html"),
+    ("Quick Start", "quick-start.html"),
+    ("Quick Ref", "quick-reference.html"),
+    ("Architecture", "complete-system-overview.html"),
+    ("API Reference", "api-reference.html"),
+    ("Troubleshooting", "troubleshooting-guide.html"),
+]
+
+# Web fonts from Google Fonts; --fonts system/local replaces this block
+GOOGLE_FONT_LINKS = """
 <link rel="preconnect" href="https://fonts.googleapis.com">
 <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
 <link href="https://fonts.googleapis.com/css2?family=Fira+Code:wght@400;500;600&family=Inter:wght@400;500;600;700&display=swap" rel="stylesheet">
+"""
 
+# CSS template for all HTML pages
+# Font stacks go through --font-sans/--font-mono so font modes can override them
+CSS_TEMPLATE = GOOGLE_FONT_LINKS + """
 <style>
     * {
         margin: 0;
@@ -21,7 +73,7 @@ CSS_TEMPLATE = """
     }
 
     body {
-        font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
+        font-family: var(--font-sans, 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif);
         font-size: 16px;
         line-height: 1.7;
         color: #1f2937;
@@ -370,7 +422,7 @@ CSS_TEMPLATE = """
         background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
         padding: 2px 6px;
         border-radius: 4px;
-        font-family: 'Fira Code', 'Courier New', Consolas, monospace;
+        font-family: var(--font-mono, 'Fira Code', 'Courier New', Consolas, monospace);
         font-size: 0.85em;
         color: #d63384;
         border: 1px solid #dee2e6;
@@ -406,7 +458,7 @@ CSS_TEMPLATE = """
         margin: 25px 0;
         border: 2px solid #334155;
         box-shadow: 0 8px 25px rgba(0,0,0,0.3), inset 0 1px 0 rgba(255,255,255,0.05);
-        font-family: 'Cascadia Code', 'Fira Code', 'SF Mono', 'Consolas', 'Liberation Mono', monospace;
+        font-family: var(--font-mono, 'Cascadia Code', 'Fira Code', 'SF Mono', 'Consolas', 'Liberation Mono', monospace);
         font-size: 0.88em;
         line-height: 1.7;
         position: relative;
@@ -775,6 +827,80 @@ CSS_TEMPLATE = """
         font-size: 0.88em;
     }
 
+    /* Images keep their intrinsic aspect ratio when scaled down */
+    img {
+        max-width: 100%;
+        height: auto;
+        border-radius: 12px;
+    }
+
+    /* Large tables: static rows paint lazily; the script swaps in a scrolled window */
+    table.virtual-table {
+        content-visibility: auto;
+        contain-intrinsic-size: auto 1500px;
+    }
+
+    .virtual-table-viewport {
+        max-height: 70vh;
+        overflow: auto;
+        margin: 25px 0;
+        border-radius: 16px;
+    }
+
+    /* overflow: visible so the sticky header sticks to the viewport, not the table */
+    .virtual-table-viewport table {
+        margin: 0;
+        overflow: visible;
+    }
+
+    .virtual-table-viewport th {
+        position: sticky;
+        top: 0;
+        z-index: 2;
+        cursor: pointer;
+        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
+    }
+
+    .virtual-table-filter {
+        width: 100%;
+        max-width: 360px;
+        margin-top: 10px;
+        padding: 10px 14px;
+        border: 2px solid rgba(102, 126, 234, 0.3);
+        border-radius: 10px;
+        font: inherit;
+    }
+
+    .virtual-spacer td {
+        padding: 0;
+        border: none;
+    }
+
+    .erd-diagram {
+        margin: 25px 0;
+        overflow: auto;
+        border: 2px solid rgba(102, 126, 234, 0.2);
+        border-radius: 16px;
+        background: #ffffff;
+        cursor: zoom-in;
+    }
+
+    .erd-diagram svg {
+        display: block;
+        width: 100%;
+        height: auto;
+    }
+
+    .erd-diagram.zoomed {
+        max-height: 85vh;
+        cursor: zoom-out;
+    }
+
+    .erd-diagram.zoomed svg {
+        width: auto;
+        max-width: none;
+    }
+
     footer {
         margin-top: 50px;
         padding-top: 30px;
@@ -816,9 +942,862 @@ CSS_TEMPLATE = """
 </style>
 """
 
-def convert_markdown_to_html(markdown_text, title, nav_links=None):
-    """Convert markdown text to HTML with styling"""
+def read_image_size(image_path):
+    """Read (width, height) from a PNG, GIF or JPEG header without decoding the image"""
+    try:
+        with open(image_path, 'rb') as f:
+            head = f.read(26)
+
+            # PNG: dimensions live in the IHDR chunk right after the signature
+            if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+                return struct.unpack('>II', head[16:24])
+
+            # GIF: logical screen size follows the 6-byte version header
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                return struct.unpack('<HH', head[6:10])
+
+            # JPEG: walk the segment headers until a start-of-frame marker
+            if head[:2] == b'\xff\xd8':
+                f.seek(2)
+                while True:
+                    marker = f.read(2)
+                    if len(marker) < 2 or marker[0] != 0xFF:
+                        return None
+                    # Skip fill bytes between segments
+                    while marker[1] == 0xFF:
+                        marker = marker[1:] + f.read(1)
+                    code = marker[1]
+                    if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+                        continue
+                    length_bytes = f.read(2)
+                    if len(length_bytes) < 2:
+                        return None
+                    length = struct.unpack('>H', length_bytes)[0]
+                    if length < 2:
+                        return None
+                    # SOF0-SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+                    if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                        frame = f.read(5)
+                        height, width = struct.unpack('>HH', frame[1:5])
+                        return width, height
+                    f.seek(length - 2, os.SEEK_CUR)
+    except (struct.error, IndexError):
+        # Truncated or corrupt header: no dimensions rather than a failed build
+        return None
+
+    return None
+
+_image_size_cache = None
+
+def _get_image_size_cache():
+    """Load the image size cache from disk on first use"""
+    global _image_size_cache
+    if _image_size_cache is None:
+        _image_size_cache = {"by_path": {}, "by_hash": {}}
+        if IMAGE_SIZE_CACHE_FILE.exists():
+            try:
+                with open(IMAGE_SIZE_CACHE_FILE, 'r', encoding='utf-8') as f:
+                    _image_size_cache.update(json.load(f))
+            except (OSError, ValueError):
+                print(f"Warning: ignoring unreadable cache {IMAGE_SIZE_CACHE_FILE}")
+    return _image_size_cache
+
+def save_image_size_cache():
+    """Persist the image size cache so repeated builds skip unchanged images"""
+    if _image_size_cache is None:
+        return
+    IMAGE_SIZE_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(IMAGE_SIZE_CACHE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(_image_size_cache, f, indent=1, sort_keys=True)
+
+def image_digest(image_path):
+    """sha256 of an image file, or None if it cannot be read
+
+    Files whose (mtime, size) stamp is unchanged are not read again.
+    """
+    cache = _get_image_size_cache()
+    try:
+        stat = os.stat(image_path)
+    except OSError:
+        return None
+
+    key = str(image_path)
+    stamp = [stat.st_mtime_ns, stat.st_size]
+    known = cache["by_path"].get(key)
+    if known and known[:2] == stamp:
+        return known[2]
+
+    with open(image_path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    cache["by_path"][key] = stamp + [digest]
+    return digest
+
+def get_image_size(image_path):
+    """Return cached (width, height) for an image file, or None if unknown
+
+    Entries are keyed by content hash. A (mtime, size) stamp per path lets
+    unchanged files skip hashing, so repeated builds never re-read them.
+    """
+    cache = _get_image_size_cache()
+    digest = image_digest(image_path)
+    if digest is None:
+        return None
+
+    if digest not in cache["by_hash"]:
+        size = read_image_size(image_path)
+        if size is None:
+            return None
+        cache["by_hash"][digest] = list(size)
+    return tuple(cache["by_hash"][digest])
+
+_REMOTE_SRC = re.compile(r'^([a-z][a-z0-9+.-]*:|//)', re.IGNORECASE)
+
+def image_hashes(markdown_text, asset_dir):
+    """{path under asset_dir: image_digest} of the local images markdown_text embeds"""
+    paths = {src.split('#')[0].split('?')[0] for src in _MARKDOWN_IMAGE_SRC.findall(markdown_text)
+             if not _REMOTE_SRC.match(src)}
+    return {path: image_digest(Path(asset_dir) / path) for path in sorted(paths) if path}
+
+def render_image(alt, src, title=None, asset_dir=None):
+    """Build an <img> tag with intrinsic dimensions and lazy loading"""
+    # Alt text may already contain inline markup; keep only its text
+    alt = re.sub(r'<[^>]+>', '', alt).replace('"', '&quot;')
+    attrs = [f'src="{escape(src, quote=True)}"', f'alt="{alt}"']
+    if title:
+        attrs.append(f'title="{escape(title, quote=True)}"')
+
+    # Only local files can be measured; remote and data URLs are left as-is
+    if not _REMOTE_SRC.match(src) and asset_dir is not None:
+        image_path = Path(asset_dir) / src.split('#')[0].split('?')[0]
+        size = get_image_size(image_path)
+        if size:
+            attrs.append(f'width="{size[0]}" height="{size[1]}"')
+        else:
+            print(f"Warning: could not read image size for {image_path}")
+
+    attrs.append('loading="lazy" decoding="async"')
+    return f'<img {" ".join(attrs)}>'
+
+_STAR_RUN = re.compile(r'\*+')
+_BACKTICK_RUN = re.compile(r'`+')
+
+def _is_punctuation(ch):
+    """ASCII or Unicode punctuation, as used by the CommonMark flanking rules"""
+    return ch in string.punctuation or unicodedata.category(ch)[0] in 'PS'
+
+def render_inline(line):
+    """Render `code`, **strong** and *em* spans within a single line
+
+    Uses the CommonMark delimiter-stack algorithm instead of non-greedy
+    regexes, so unbalanced input (ASCII art, wildcard paths like /api/**)
+    is left literal and every line renders in linear time.
+    """
+    if '*' not in line and '`' not in line:
+        return line
+    n = len(line)
+
+    # STEP 1: Pair backtick runs of equal length into code spans.
+    # Each length keeps a queue of run indexes, so every run is visited once.
+    runs = [(m.start(), m.end()) for m in _BACKTICK_RUN.finditer(line)]
+    runs_by_length = {}
+    for index, (start, end) in enumerate(runs):
+        runs_by_length.setdefault(end - start, deque()).append(index)
+
+    code_spans = []
+    index = 0
+    while index < len(runs):
+        start, end = runs[index]
+        candidates = runs_by_length[end - start]
+        while candidates and candidates[0] <= index:
+            candidates.popleft()
+        if candidates:
+            closing = candidates.popleft()
+            code_spans.append((start, runs[closing][1], end - start))
+            index = closing + 1
+        else:
+            index += 1
+
+    # STEP 2: Tokenize text around the code spans, recording * runs as delimiters
+    tokens = []
+    delimiters = []
+    pos = 0
+    for span_start, span_end, ticks in code_spans + [(n, n, 0)]:
+        for match in _STAR_RUN.finditer(line, pos, span_start):
+            tokens.append(line[pos:match.start()])
+            before = line[match.start() - 1] if match.start() > 0 else ' '
+            after = line[match.end()] if match.end() < n else ' '
+            left_flanking = not after.isspace() and (
+                not _is_punctuation(after) or before.isspace() or _is_punctuation(before))
+            right_flanking = not before.isspace() and (
+                not _is_punctuation(before) or after.isspace() or _is_punctuation(after))
+            delimiter = {
+                'length': match.end() - match.start(),
+                'count': match.end() - match.start(),
+                'can_open': left_flanking,
+                'can_close': right_flanking,
+                'opens': [],
+                'closes': [],
+            }
+            tokens.append(delimiter)
+            delimiters.append(delimiter)
+            pos = match.end()
+        tokens.append(line[pos:span_start])
+        if ticks:
+            code = line[span_start + ticks:span_end - ticks]
+            if len(code) > 2 and code[0] == ' ' and code[-1] == ' ' and code.strip():
+                code = code[1:-1]
+            tokens.append(f'<code>{code}</code>')
+        pos = span_end
+
+    # STEP 3: Match closers against the opener stack.
+    # openers_bottom remembers how far down a failed search already looked
+    # (per closer kind), which keeps the whole pass linear.
+    openers = []
+    openers_bottom = {}
+    for closer in delimiters:
+        if closer['can_close']:
+            key = (closer['can_open'], closer['length'] % 3)
+            while closer['count'] and openers:
+                bottom = min(openers_bottom.get(key, 0), len(openers))
+                found = None
+                for k in range(len(openers) - 1, bottom - 1, -1):
+                    opener = openers[k]
+                    # "Rule of 3": ***a* and similar runs may not pair
+                    if ((opener['can_close'] or closer['can_open'])
+                            and (opener['length'] + closer['length']) % 3 == 0
+                            and not (opener['length'] % 3 == 0 and closer['length'] % 3 == 0)):
+                        continue
+                    found = k
+                    break
+                if found is None:
+                    openers_bottom[key] = len(openers)
+                    break
+
+                # Unmatched delimiters between the pair stay literal
+                opener = openers[found]
+                del openers[found + 1:]
+                used = 2 if opener['count'] >= 2 and closer['count'] >= 2 else 1
+                tag = 'strong' if used == 2 else 'em'
+                opener['count'] -= used
+                closer['count'] -= used
+                opener['opens'].append(f'<{tag}>')
+                closer['closes'].append(f'</{tag}>')
+                if not opener['count']:
+                    openers.pop()
+                for kind in openers_bottom:
+                    openers_bottom[kind] = min(openers_bottom[kind], len(openers))
+        if closer['can_open'] and closer['count']:
+            openers.append(closer)
+
+    # STEP 4: Emit tokens; earlier matches are innermost
+    out = []
+    for token in tokens:
+        if isinstance(token, str):
+            out.append(token)
+        else:
+            out.append(''.join(token['closes']))
+            out.append('*' * token['count'])
+            out.append(''.join(reversed(token['opens'])))
+    return ''.join(out)
+
+# Pathological inline inputs that used to make the regex rules scan far ahead
+# or mis-pair delimiters. Each entry: (name, line builder taking a size).
+INLINE_STRESS_CORPUS = [
+    ("star-run", lambda n: '*' * n),
+    ("star-pairs", lambda n: '** ' * n),
+    ("open-only", lambda n: '**a ' * n),
+    ("close-only", lambda n: 'a** ' * n),
+    ("alternating", lambda n: '*a**' * n),
+    ("nested-openers", lambda n: '*' * n + 'a' + '**' * n),
+    ("wildcard-paths", lambda n: '/api/** ' * n),
+    ("ascii-diagram", lambda n: '|' + '*-' * n + '|'),
+    ("backtick-ladder", lambda n: ''.join('`' * (i % 50 + 1) + 'x' for i in range(n))),
+    ("unclosed-code", lambda n: '`' + 'a **b** ' * n),
+]
+
+# Expected renderings that the stack algorithm must keep producing
+INLINE_EXPECTED = [
+    ("**bold** and *em*", "<strong>bold</strong> and <em>em</em>"),
+    ("***both***", "<em><strong>both</strong></em>"),
+    ("GET /api/** and /files/*", "GET /api/** and /files/*"),
+    ("a * b * c", "a * b * c"),
+    ("`**raw**` stays code", "<code>**raw**</code> stays code"),
+    ("**a `b` c**", "<strong>a <code>b</code> c</strong>"),
+    ("``a`b``", "<code>a`b</code>"),
+    ("**foo*bar*baz**", "<strong>foo<em>bar</em>baz</strong>"),
+]
+
+def time_inline(line, repeat=3):
+    """Best-of-`repeat` seconds render_inline takes on line"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render_inline(line)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def check_inline_rendering(size=5000, time_budget=0.5):
+    """Run the inline stress corpus and fail on wrong output or super-linear timing
+
+    Each corpus line is rendered at `size` and at 4x `size`. The larger run
+    must finish within `time_budget` seconds and take no more than ~8x the
+    smaller one (linear growth is 4x; the slack absorbs timer noise).
+    """
+    failures = []
+    for text, expected in INLINE_EXPECTED:
+        actual = render_inline(text)
+        if actual != expected:
+            failures.append(f"{text!r}: expected {expected!r}, got {actual!r}")
+
+    for name, build in INLINE_STRESS_CORPUS:
+        small, large = (time_inline(build(n)) for n in (size, size * 4))
+        status = "[OK]"
+        if large > time_budget:
+            status = "[FAIL]"
+            failures.append(f"{name}: {large:.3f}s exceeds budget of {time_budget}s")
+        elif large > 8 * max(small, 0.001):
+            status = "[FAIL]"
+            failures.append(f"{name}: {small:.4f}s -> {large:.4f}s grows faster than linear")
+        print(f"{status} {name:16} {small * 1000:8.2f} ms -> {large * 1000:8.2f} ms")
+
+    for failure in failures:
+        print(f"Error: {failure}")
+    return not failures
+
+# Structured "**Field:** value" lines that describe services and modules
+METADATA_FIELD_PATTERN = r'^\*\*(Location|Artifact|Purpose|Port|Technology|Internal Name|Why (?:Important|Critical)|What is|Key (?:Operations|Concepts|Jobs|Features)|GraphQL Operations):\*\*[ \t]*([^\r\n]*)$'
+
+# Tables with more body rows than this also ship their rows as JSON so the
+# virtual table script can render only the visible window
+TABLE_VIRTUALIZE_ROWS = 100
+
+_VIRTUAL_TABLE_DATA = re.compile(r'(<script type="application/json" class="virtual-table-data">)(.*?)(</script>)',
+                                 re.DOTALL)
+
+def virtual_table_json(rows):
+    """Body rows of a virtual table; "<" is escaped so a cell can never close the script"""
+    return json.dumps(rows, ensure_ascii=False).replace('<', '\\u003c')
+
+VIRTUAL_TABLE_SCRIPT = """
+<script>
+(function () {
+    var BUFFER_ROWS = 15;
+
+    function setup(table) {
+        var rows = JSON.parse(table.querySelector('script.virtual-table-data').textContent);
+        var tbody = table.tBodies[0];
+        var headers = table.tHead ? table.tHead.rows[0].cells : [];
+        var columns = headers.length || (rows[0] || []).length;
+        var rowHeight = Math.max(24, tbody.offsetHeight / Math.max(1, tbody.rows.length));
+        var text = rows.map(function (row) {
+            return row.join(' ').replace(/<[^>]+>/g, '').toLowerCase();
+        });
+        var view = rows.map(function (_, i) { return i; });
+        var sortColumn = -1, ascending = true, pending = false;
+
+        var filter = document.createElement('input');
+        filter.type = 'search';
+        filter.className = 'virtual-table-filter';
+        filter.placeholder = 'Filter ' + rows.length + ' rows...';
+        var viewport = document.createElement('div');
+        viewport.className = 'virtual-table-viewport';
+        table.parentNode.insertBefore(filter, table);
+        table.parentNode.insertBefore(viewport, table);
+        viewport.appendChild(table);
+
+        function spacer(height) {
+            return height > 0 ? '<tr class="virtual-spacer" style="height:' + height + 'px"><td colspan="'
+                + columns + '"></td></tr>' : '';
+        }
+        function draw() {
+            pending = false;
+            var offset = Math.max(0, viewport.scrollTop - (table.tHead ? table.tHead.offsetHeight : 0));
+            var start = Math.max(0, Math.floor(offset / rowHeight) - BUFFER_ROWS);
+            var end = Math.min(view.length, start + Math.ceil(viewport.clientHeight / rowHeight) + 2 * BUFFER_ROWS);
+            var html = [spacer(start * rowHeight)];
+            for (var i = start; i < end; i++) {
+                html.push('<tr><td>' + rows[view[i]].join('</td><td>') + '</td></tr>');
+            }
+            html.push(spacer((view.length - end) * rowHeight));
+            tbody.innerHTML = html.join('');
+        }
+        function schedule() {
+            if (!pending) {
+                pending = true;
+                requestAnimationFrame(draw);
+            }
+        }
+        function refresh() {
+            var query = filter.value.toLowerCase();
+            view = [];
+            for (var i = 0; i < rows.length; i++) {
+                if (!query || text[i].indexOf(query) !== -1) {
+                    view.push(i);
+                }
+            }
+            if (sortColumn >= 0) {
+                view.sort(function (a, b) {
+                    var x = (rows[a][sortColumn] || '').replace(/<[^>]+>/g, '');
+                    var y = (rows[b][sortColumn] || '').replace(/<[^>]+>/g, '');
+                    return (ascending ? 1 : -1) * x.localeCompare(y, undefined, {numeric: true});
+                });
+            }
+            viewport.scrollTop = 0;
+            draw();
+        }
+
+        Array.prototype.forEach.call(headers, function (th, column) {
+            th.addEventListener('click', function () {
+                ascending = sortColumn === column ? !ascending : true;
+                sortColumn = column;
+                refresh();
+            });
+        });
+        filter.addEventListener('input', refresh);
+        viewport.addEventListener('scroll', schedule);
+        draw();
+    }
+
+    function init() {
+        Array.prototype.forEach.call(document.querySelectorAll('table.virtual-table'), setup);
+    }
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', init);
+    } else {
+        init();
+    }
+})();
+</script>
+"""
+
+# Same-site link clicks fetch fragments/<page> and swap the container content
+# below the nav header; any failure falls back to a normal page load
+PAGE_NAV_SCRIPT = """
+<script>
+(function () {
+    if (!window.fetch || !window.DOMParser || !window.URL || !history.pushState) {
+        return;
+    }
+    var container = document.querySelector('.container');
+    var shell = container && container.querySelector('.nav-header');
+    if (!shell) {
+        return;
+    }
+    var current = location.pathname, pending = 0;
+
+    function directory(path) {
+        return path.slice(0, path.lastIndexOf('/') + 1);
+    }
+    function show(url, push) {
+        var token = ++pending;
+        var path = url.pathname;
+        fetch(directory(path) + 'fragments/' + path.slice(directory(path).length)).then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.status);
+            }
+            return response.text();
+        }).then(function (text) {
+            if (token !== pending) {
+                return;
+            }
+            var page = new DOMParser().parseFromString(text, 'text/html');
+            var scripts = Array.prototype.slice.call(page.body.querySelectorAll('script:not([type])'));
+            scripts.forEach(function (script) { script.parentNode.removeChild(script); });
+            while (shell.nextSibling) {
+                container.removeChild(shell.nextSibling);
+            }
+            while (page.body.firstChild) {
+                container.appendChild(document.adoptNode(page.body.firstChild));
+            }
+            if (push) {
+                history.pushState(null, '', url.href);
+            }
+            current = location.pathname;
+            document.title = page.title;
+            // Re-run the page's own scripts (tables, filters) against the new content
+            scripts.forEach(function (script) {
+                var run = document.createElement('script');
+                run.textContent = script.textContent;
+                document.body.appendChild(run).parentNode.removeChild(run);
+            });
+            var target = url.hash && document.getElementById(decodeURIComponent(url.hash.slice(1)));
+            if (target) {
+                target.scrollIntoView();
+            } else {
+                window.scrollTo(0, 0);
+            }
+        }).catch(function () {
+            if (push) {
+                location.href = url.href;
+            } else {
+                location.reload();
+            }
+        });
+    }
+
+    document.addEventListener('click', function (event) {
+        var link = event.target.closest && event.target.closest('a[href]');
+        if (!link || event.defaultPrevented || event.button !== 0 || event.metaKey || event.ctrlKey
+                || event.shiftKey || event.altKey || link.target || link.hasAttribute('download')) {
+            return;
+        }
+        var url = new URL(link.href, location.href);
+        if (url.origin !== location.origin || !/\\.html$/.test(url.pathname)
+                || url.pathname === location.pathname
+                || directory(url.pathname) !== directory(location.pathname)) {
+            return;
+        }
+        event.preventDefault();
+        show(url, true);
+    });
+    window.addEventListener('popstate', function () {
+        if (location.pathname !== current) {
+            show(new URL(location.href), false);
+        }
+    });
+})();
+</script>
+"""
+
+# Mermaid erDiagram blocks become inline SVG at build time (see render_er_diagram)
+ERD_CACHE_DIR = CACHE_DIR / "erd"
+ERD_CHAR_WIDTH = 7.2  # advance of the 12px monospace font
+ERD_LINE_HEIGHT = 18
+ERD_PADDING = 10
+ERD_GAP_X = 36
+ERD_GAP_Y = 80
+ERD_DUMMY_WIDTH = 16
+_ERD_NAME = r'("?)([\w-]+)\1'
+_ERD_RELATION = re.compile(r'^' + _ERD_NAME + r'\s+([|}][|o])(--|\.\.)([o|][|{])\s+("?)([\w-]+)\6\s*:\s*"?(.*?)"?$')
+_ERD_ENTITY = re.compile(r'^' + _ERD_NAME + r'\s*\{$')
+# Cardinality markers, drawn for the end of a line arriving at x=0
+_ERD_CARDINALITY = {"||": "one", "|o": "zero-one", "o|": "zero-one", "}|": "many", "|{": "many",
+                    "}o": "zero-many", "o{": "zero-many"}
+_ERD_MARKERS = {
+    "one": '<path d="M-7,-6V6M-12,-6V6"/>',
+    "zero-one": '<path d="M-7,-6V6"/><circle cx="-14" cy="0" r="3.5" fill="#fff"/>',
+    "many": '<path d="M0,-6L-10,0L0,6M0,0H-10M-13,-6V6"/>',
+    "zero-many": '<path d="M0,-6L-10,0L0,6M0,0H-10"/><circle cx="-15" cy="0" r="3.5" fill="#fff"/>',
+}
+
+ERD_SCRIPT = """
+<script>
+(function () {
+    Array.prototype.forEach.call(document.querySelectorAll('.erd-diagram'), function (figure) {
+        figure.addEventListener('click', function () { figure.classList.toggle('zoomed'); });
+    });
+})();
+</script>
+"""
+
+def parse_er_diagram(source):
+    """Entities ({name: [(type, attribute, keys)]}, in order) and relationships of a mermaid erDiagram"""
+    entities = {}
+    relations = []
+    current = None
+    for line in source.split('\n'):
+        line = line.split('%%', 1)[0].strip()
+        if not line or line == 'erDiagram':
+            continue
+        if current is not None:
+            if line == '}':
+                current = None
+            else:
+                parts = line.split(None, 2)
+                keys = parts[2].split('"', 1)[0].strip() if len(parts) > 2 else ""
+                entities[current].append((parts[0], parts[1] if len(parts) > 1 else "", keys))
+            continue
+        entity = _ERD_ENTITY.match(line)
+        relation = _ERD_RELATION.match(line)
+        if entity:
+            current = entity.group(2)
+            entities.setdefault(current, [])
+        elif relation:
+            left, left_card, style, right_card, right, label = relation.group(2, 3, 4, 5, 7, 8)
+            entities.setdefault(left, [])
+            entities.setdefault(right, [])
+            relations.append((left, left_card, right_card, right, label, style == '..'))
+    return entities, relations
+
+def layout_er_diagram(entities, relations):
+    """Deterministic layered layout: boxes {name: (x, y, w, h)}, edges, width, height
+
+    Each edge is (points, relation, starts_at_left): the line runs from the
+    upper entity down to the lower one.
+
+    The "one" side of each relationship sits above the "many" side. Layers
+    come from longest paths (cycles broken in declaration order), edges
+    spanning several layers get dummy nodes, and rows are ordered by a few
+    barycenter sweeps with declaration order breaking ties.
+    """
+    order = {name: index for index, name in enumerate(entities)}
+    edges = []
+    for relation in relations:
+        left, left_card, right_card, right = relation[:4]
+        many_left, many_right = left_card[0] == '}', right_card[1] == '{'
+        edges.append((right, left) if many_left and not many_right else (left, right))
+    
+    # Break cycles: drop edges that close a cycle in a declaration-order DFS
+    children = {name: [] for name in entities}
+    for parent, child in dict.fromkeys(edges):
+        if parent != child:
+            children[parent].append(child)
+    state = {}
+    acyclic = {name: [] for name in entities}
+    def visit(name):
+        state[name] = 1
+        for child in sorted(children[name], key=order.get):
+            if state.get(child) == 1:
+                continue
+            acyclic[name].append(child)
+            if child not in state:
+                visit(child)
+        state[name] = 2
+    for name in entities:
+        if name not in state:
+            visit(name)
+    
+    # Longest-path layers
+    layer = {}
+    def depth(name):
+        if name not in layer:
+            parents = [parent for parent in entities if name in acyclic[parent]]
+            layer[name] = max((depth(parent) + 1 for parent in parents), default=0)
+        return layer[name]
+    for name in entities:
+        depth(name)
+    
+    # Chains of dummy nodes for edges spanning several layers
+    rows = [[] for _ in range(max(layer.values(), default=0) + 1)]
+    for name in entities:
+        rows[layer[name]].append(name)
+    chains = []
+    for parent, child in edges:
+        top, bottom = (parent, child) if layer[parent] <= layer[child] else (child, parent)
+        if top == bottom:
+            chains.append([top, bottom])
+            continue
+        chain = [top]
+        for level in range(layer[top] + 1, layer[bottom]):
+            dummy = ("dummy", len(chains), level)
+            rows[level].append(dummy)
+            layer[dummy] = level
+            chain.append(dummy)
+        chains.append(chain + [bottom])
+    neighbours = {}
+    for chain in chains:
+        for upper, lower in zip(chain, chain[1:]):
+            neighbours.setdefault(lower, []).append(upper)
+            neighbours.setdefault(upper, []).append(lower)
+    
+    # Barycenter ordering, alternating downward and upward sweeps
+    position = {node: index for row in rows for index, node in enumerate(row)}
+    tie = {node: order.get(node, len(order) + index) for index, node in enumerate(position)}
+    for sweep in range(8):
+        levels = range(1, len(rows)) if sweep % 2 == 0 else range(len(rows) - 2, -1, -1)
+        for level in levels:
+            def barycenter(node):
+                adjacent = [position[other] for other in neighbours.get(node, [])
+                            if layer[other] == level + (-1 if sweep % 2 == 0 else 1)]
+                return (sum(adjacent) / len(adjacent) if adjacent else position[node], tie[node])
+            rows[level].sort(key=barycenter)
+            for index, node in enumerate(rows[level]):
+                position[node] = index
+    
+    # Coordinates: rows centered, row height from the tallest box
+    size = {}
+    for row in rows:
+        for node in row:
+            if node in entities:
+                lines = [node] + [f"{name} {kind} {keys}".strip() for kind, name, keys in entities[node]]
+                width = max(len(text) for text in lines) * ERD_CHAR_WIDTH + 2 * ERD_PADDING + 16
+                size[node] = (round(width), ERD_LINE_HEIGHT * (len(lines) + 1))
+            else:
+                size[node] = (ERD_DUMMY_WIDTH, 0)
+    width = max(sum(size[node][0] for node in row) + ERD_GAP_X * (len(row) - 1) for row in rows) + 2 * ERD_GAP_X
+    boxes = {}
+    y = ERD_GAP_X
+    for row in rows:
+        x = (width - sum(size[node][0] for node in row) - ERD_GAP_X * (len(row) - 1)) / 2
+        row_height = max(size[node][1] for node in row)
+        for node in row:
+            boxes[node] = (round(x), y, size[node][0], size[node][1] or row_height)
+            x += size[node][0] + ERD_GAP_X
+        y += row_height + ERD_GAP_Y
+    height = y - ERD_GAP_Y + ERD_GAP_X
+    
+    routed = []
+    for chain, relation in zip(chains, relations):
+        points = []
+        for index, node in enumerate(chain):
+            x, top, w, h = boxes[node]
+            if index > 0:
+                points.append((x + w / 2, top))
+            if index < len(chain) - 1:
+                points.append((x + w / 2, top + h))
+        routed.append((points, relation, chain[0] == relation[0]))
+    return {name: boxes[name] for name in entities}, routed, width, height
+
+def _erd_path(points):
+    """Smooth vertical curve through the points (bottom of one box to the top of the next)"""
+    commands = [f"M{points[0][0]:.0f},{points[0][1]:.0f}"]
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
+        middle = (y1 + y2) / 2
+        commands.append(f"C{x1:.0f},{middle:.0f} {x2:.0f},{middle:.0f} {x2:.0f},{y2:.0f}")
+    return "".join(commands)
+
+def render_er_diagram(source):
+    """Inline SVG for a mermaid erDiagram, cached on disk by source and converter hash
+
+    Returns None when the diagram declares no entities.
+    """
+    cache_path = ERD_CACHE_DIR / f"{content_hash(script_hash() + source)[:32]}.svg"
+    with contextlib.suppress(FileNotFoundError):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return f.read()
+    
+    entities, relations = parse_er_diagram(source)
+    if not entities:
+        return None
+    boxes, edges, width, height = layout_er_diagram(entities, relations)
+    out = [f'<figure class="erd-diagram" title="Click to zoom"><svg xmlns="http://www.w3.org/2000/svg" '
+           f'viewBox="0 0 {width} {height}" width="{width}" height="{height}" role="img" '
+           f'aria-label="Entity-relationship diagram of {len(entities)} entities" '
+           f'font-family="ui-monospace, SFMono-Regular, Menlo, Consolas, monospace" font-size="12">',
+           '<defs>']
+    for name, shape in _ERD_MARKERS.items():
+        out.append(f'<marker id="erd-{name}" viewBox="-18 -8 20 16" refX="0" refY="0" markerWidth="20" '
+                   f'markerHeight="16" markerUnits="userSpaceOnUse" orient="auto-start-reverse" '
+                   f'fill="none" stroke="#764ba2" stroke-width="1.5">{shape}</marker>')
+    out.append('</defs>')
     
+    # Edges first so boxes cover line ends; labels go on the middle segment
+    labels = []
+    for points, (left, left_card, right_card, right, label, dashed), starts_at_left in edges:
+        start, end = (left_card, right_card) if starts_at_left else (right_card, left_card)
+        dash = ' stroke-dasharray="6 4"' if dashed else ''
+        out.append(f'<path d="{_erd_path(points)}" fill="none" stroke="#764ba2" stroke-width="1.5"{dash} '
+                   f'marker-start="url(#erd-{_ERD_CARDINALITY[start]})" '
+                   f'marker-end="url(#erd-{_ERD_CARDINALITY[end]})"/>')
+        (x1, y1), (x2, y2) = points[(len(points) - 1) // 2], points[(len(points) - 1) // 2 + 1]
+        labels.append(f'<text x="{(x1 + x2) / 2:.0f}" y="{(y1 + y2) / 2 + 4:.0f}" text-anchor="middle" '
+                      f'fill="#475569" stroke="#fff" stroke-width="4" paint-order="stroke">{escape(label)}</text>')
+    out += labels
+    
+    for name, (x, y, w, h) in boxes.items():
+        out.append(f'<g transform="translate({x},{y})">'
+                   f'<rect width="{w}" height="{h}" rx="8" fill="#fff" stroke="#667eea" stroke-width="1.5"/>'
+                   f'<path d="M0,{ERD_LINE_HEIGHT + 8}V8a8,8 0 0 1 8,-8H{w - 8}a8,8 0 0 1 8,8V{ERD_LINE_HEIGHT + 8}Z" fill="#667eea"/>'
+                   f'<text x="{w / 2:.0f}" y="{ERD_LINE_HEIGHT}" text-anchor="middle" font-weight="bold" '
+                   f'fill="#fff">{escape(name)}</text>')
+        for index, (kind, attribute, keys) in enumerate(entities[name]):
+            baseline = ERD_LINE_HEIGHT * (index + 2) + 6
+            key_span = f' <tspan fill="#c2410c">{escape(keys)}</tspan>' if keys else ''
+            out.append(f'<text x="{ERD_PADDING}" y="{baseline}" fill="#1e293b">{escape(attribute)}{key_span}</text>'
+                       f'<text x="{w - ERD_PADDING}" y="{baseline}" text-anchor="end" fill="#94a3b8">{escape(kind)}</text>')
+        out.append('</g>')
+    out.append('</svg></figure>')
+    svg = "".join(out)
+    write_if_changed(cache_path, svg)
+    return svg
+
+_HEADING_LINE = re.compile(r'^#{1,6} ', re.MULTILINE)
+_FENCED_CODE = re.compile(r'```(\w+)?\n(.*?)```', re.DOTALL)
+
+def split_markdown_blocks(markdown_text):
+    """Split markdown into heading-led blocks that can be rendered independently
+
+    Every heading closes open lists, tables and paragraphs, so rendering the
+    blocks one by one and concatenating them gives exactly the rendering of
+    the whole text, as long as cuts fall right before heading lines outside
+    fenced code.
+    """
+    fences = [match.span() for match in _FENCED_CODE.finditer(markdown_text)]
+    blocks = []
+    start = 0
+    fence_index = 0
+    for match in _HEADING_LINE.finditer(markdown_text):
+        cut = match.start()
+        while fence_index < len(fences) and fences[fence_index][1] <= cut:
+            fence_index += 1
+        # A "# comment" line inside a code block is not a heading
+        if fence_index < len(fences) and fences[fence_index][0] < cut:
+            continue
+        if cut > start:
+            blocks.append(markdown_text[start:cut])
+            start = cut
+    blocks.append(markdown_text[start:])
+    return blocks
+
+class RenderCache:
+    """Bounded LRU of rendered blocks keyed by a hash of their markdown source"""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, block, asset_dir=None):
+        key = hashlib.sha1(f"{asset_dir}\0{block}".encode('utf-8')).hexdigest()
+        html = self.entries.get(key)
+        if html is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return html
+
+        html = render_markdown_block(block, asset_dir)
+        self.entries[key] = html
+        self.misses += 1
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return html
+
+    def stats(self):
+        return {"entries": len(self.entries), "max_entries": self.max_entries,
+                "hits": self.hits, "misses": self.misses}
+
+_HEADING_ELEMENT = re.compile(r'<h([1-6])>(.*?)</h\1>', re.DOTALL)
+
+def heading_slug(heading_html):
+    """GitHub-style anchor for a heading, so existing [text](#anchor) links resolve"""
+    text = unescape(re.sub(r'<[^>]+>', '', heading_html)).strip().lower()
+    return re.sub(r'[^\w\- ]', '', text).replace(' ', '-')
+
+def render_heading(line):
+    """Inner HTML the page gives a "## heading" line, links and images converted"""
+    match = _HEADING_ELEMENT.search(render_markdown_block(line))
+    return match.group(2) if match else ""
+
+class HeadingIds:
+    """Unique heading ids for one page, assigned in document order"""
+
+    def __init__(self):
+        self.seen = {}
+
+    def assign(self, heading_html):
+        slug = heading_slug(heading_html) or "section"
+        count = self.seen.get(slug, 0)
+        self.seen[slug] = count + 1
+        return f"{slug}-{count}" if count else slug
+
+def render_markdown_body(markdown_text, asset_dir=None, cache=None):
+    """Convert markdown text to the HTML that goes inside the page container
+
+    Image paths are resolved against asset_dir (the directory the page is
+    published to) so their dimensions can be read at build time. With a
+    RenderCache, blocks whose source is unchanged are not re-rendered.
+    """
+    rendered = [cache.render(block, asset_dir) if cache else render_markdown_block(block, asset_dir)
+                for block in split_markdown_blocks(markdown_text)]
+    # Ids are page-wide (duplicates get -1, -2 ...), so they are added after the blocks
+    ids = HeadingIds()
+    return _HEADING_ELEMENT.sub(lambda match: f'<h{match.group(1)} id="{ids.assign(match.group(2))}">'
+                                              f'{match.group(2)}</h{match.group(1)}>', ''.join(rendered))
+
+def render_markdown_block(markdown_text, asset_dir=None):
+    """Convert one block of markdown (see split_markdown_blocks) to HTML"""
+
     # STEP 1: Extract and protect code blocks from further processing
     code_blocks = []
     code_block_placeholder = "___CODE_BLOCK_{}_PLACEHOLDER___"
@@ -826,6 +1805,13 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
     def extract_code_block(match):
         lang = match.group(1) or ''
         code = match.group(2)
+        diagram = None
+        if lang == 'mermaid' and code.lstrip().startswith('erDiagram'):
+            diagram = render_er_diagram(code)
+        if diagram:
+            placeholder = code_block_placeholder.format(len(code_blocks))
+            code_blocks.append(diagram)
+            return placeholder
         # Escape HTML entities
         code = code.replace('<', '&lt;').replace('>', '&gt;')
         # Store the processed code block
@@ -852,7 +1838,7 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
     # This ensures Location:, Artifact:, Purpose: etc. get proper wrapping
     # Pattern matches: **FieldName:** followed by any content until end of line
     # Use [^\r\n]* instead of .* to avoid matching across line boundaries
-    metadata_pattern = r'^\*\*(Location|Artifact|Purpose|Port|Technology|Internal Name|Why (?:Important|Critical)|What is|Key (?:Operations|Concepts|Jobs|Features)|GraphQL Operations):\*\*[ \t]*([^\r\n]*)$'
+    metadata_pattern = METADATA_FIELD_PATTERN
     
     def metadata_replacer(match):
         field_name = match.group(1)
@@ -866,12 +1852,15 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
         flags=re.MULTILINE
     )
     
-    # Bold and italic
-    markdown_text = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', markdown_text)
-    markdown_text = re.sub(r'\*(.*?)\*', r'<em>\1</em>', markdown_text)
+    # Bold, italic and inline code (linear-time delimiter scan, one line at a time)
+    markdown_text = '\n'.join(render_inline(line) for line in markdown_text.split('\n'))
     
-    # Inline code
-    markdown_text = re.sub(r'`([^`]+)`', r'<code>\1</code>', markdown_text)
+    # Images (before links, which would otherwise swallow the [alt](src) part)
+    markdown_text = re.sub(
+        r'!\[([^\]]*)\]\(([^)\s]+)(?:\s+"([^"]*)")?\)',
+        lambda m: render_image(m.group(1), m.group(2), m.group(3), asset_dir),
+        markdown_text
+    )
     
     # Links
     markdown_text = re.sub(r'\[([^\]]+)\]\(([^\)]+)\)', r'<a href="\2">\1</a>', markdown_text)
@@ -884,6 +1873,17 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
     in_table = False
     is_header_row = True
     current_list_item = []  # Buffer for multi-line list items
+    table_state = {"start": 0, "rows": [], "after_header": False}  # Open table: start index, body rows, header just written
+    
+    def close_table():
+        """Close the open table; large ones also carry their rows as JSON for virtual scrolling"""
+        result.append('</tbody></table>')
+        rows = table_state["rows"]
+        if len(rows) > TABLE_VIRTUALIZE_ROWS:
+            result[table_state["start"]] = (
+                '<table class="virtual-table">'
+                f'<script type="application/json" class="virtual-table-data">{virtual_table_json(rows)}</script>'
+            )
     
     def flush_list_item():
         """Flush buffered list item content"""
@@ -908,7 +1908,7 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
                 result.append('</ol>')
                 in_ordered_list = False
             if in_table:
-                result.append('</tbody></table>')
+                close_table()
                 in_table = False
             
             # Add metadata field line as-is
@@ -917,9 +1917,10 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
         
         # Table detection
         if stripped.startswith('|') and stripped.endswith('|'):
-            # Skip separator rows (e.g., |---|---|)
-            if re.match(r'^\s*\|[\s\-:]+\|\s*$', line):
-                is_header_row = False
+            # Skip the delimiter row (e.g., |---|---|); only the row right after
+            # the header is one, so a data row such as | - | - | still renders
+            if in_table and table_state["after_header"] and re.match(r'^\s*\|[\s:|]*-[\s\-:|]*\|\s*$', line):
+                table_state["after_header"] = False
                 continue
             
             # Close any open lists
@@ -933,6 +1934,8 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
                 in_ordered_list = False
             
             if not in_table:
+                table_state["start"] = len(result)
+                table_state["rows"] = []
                 result.append('<table>')
                 in_table = True
                 is_header_row = True
@@ -946,16 +1949,19 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
                     result.append(f'<th>{cell}</th>')
                 result.append('</tr></thead><tbody>')
                 is_header_row = False
+                table_state["after_header"] = True
             else:
+                table_state["after_header"] = False
                 result.append('<tr>')
                 for cell in cells:
                     result.append(f'<td>{cell}</td>')
                 result.append('</tr>')
+                table_state["rows"].append(cells)
         
         # Ordered list (not indented)
         elif re.match(r'^\d+\. ', line) and indent_level == 0:
             if in_table:
-                result.append('</tbody></table>')
+                close_table()
                 in_table = False
             
             # Flush previous list item
@@ -979,7 +1985,7 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
         # Unordered list (not indented)
         elif re.match(r'^- ', line) and indent_level == 0:
             if in_table:
-                result.append('</tbody></table>')
+                close_table()
                 in_table = False
             
             # Flush previous list item
@@ -1018,7 +2024,7 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
         else:
             # Close any open structures
             if in_table:
-                result.append('</tbody></table>')
+                close_table()
                 in_table = False
             if in_list or in_ordered_list:
                 flush_list_item()
@@ -1036,7 +2042,7 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
     if in_list or in_ordered_list:
         flush_list_item()
     if in_table:
-        result.append('</tbody></table>')
+        close_table()
     if in_list:
         result.append('</ul>')
     if in_ordered_list:
@@ -1049,6 +2055,10 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
     
     # Paragraphs - split on double newlines but not inside lists/tables
     markdown_text = re.sub(r'\n\n+', '\n</p>\n<p>\n', markdown_text)
+    # Headings and code blocks end the open paragraph and start the next one,
+    # so a heading-led block (see split_markdown_blocks) is balanced on its own
+    markdown_text = re.sub(r'\n?^(<h[1-6]>.*</h[1-6]>|___CODE_BLOCK_\d+_PLACEHOLDER___)$', r'</p>\n\1\n<p>',
+                           markdown_text, flags=re.MULTILINE)
     markdown_text = '<p>' + markdown_text + '</p>'
     
     # Clean up empty paragraphs and malformed tags
@@ -1057,7 +2067,7 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
     markdown_text = re.sub(r'(</h[1-6]>)\s*</p>', r'\1\n', markdown_text)
     markdown_text = re.sub(r'<p>\s*(<pre>)', r'\n\1', markdown_text)
     markdown_text = re.sub(r'(</pre>)\s*</p>', r'\1\n', markdown_text)
-    markdown_text = re.sub(r'<p>\s*(<ul>|<ol>|<hr>|<table>)', r'\n\1', markdown_text)
+    markdown_text = re.sub(r'<p>\s*(<ul>|<ol>|<hr>|<table\b[^>]*>)', r'\n\1', markdown_text)
     markdown_text = re.sub(r'(</ul>|</ol>|<hr>|</table>)\s*</p>', r'\1\n', markdown_text)
     markdown_text = re.sub(r'<p>\s*(<thead>|<tbody>)', r'\1', markdown_text)
     markdown_text = re.sub(r'(</thead>|</tbody>)\s*</p>', r'\1', markdown_text)
@@ -1086,11 +2096,38 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
     # Add spacing around hr
     markdown_text = re.sub(r'<hr>', r'\n<hr>\n', markdown_text)
     
+    # Drop the </p> the cleanups above left without an open <p>; as in a
+    # browser, block elements and code blocks close an open paragraph
+    open_paragraphs = 0
+    
+    def balance_paragraph(match):
+        nonlocal open_paragraphs
+        tag = match.group(0)
+        if tag == '<p>':
+            open_paragraphs += 1
+        elif tag == '</p>':
+            if not open_paragraphs:
+                return ''
+            open_paragraphs -= 1
+        else:
+            open_paragraphs = 0
+        return tag
+    
+    markdown_text = re.sub(r'</?p>|<(?:h[1-6]|ul|ol|table|div|hr|blockquote)\b|___CODE_BLOCK_\d+_PLACEHOLDER___',
+                           balance_paragraph, markdown_text)
+    
     # STEP 3: Restore code blocks (protected content)
     for i, code_block in enumerate(code_blocks):
         placeholder = code_block_placeholder.format(i)
         markdown_text = markdown_text.replace(placeholder, code_block)
     
+    return markdown_text
+
+SITE_VERSION_NOTE = "Version 3.1.9-SNAPSHOT • Last Updated: February 2026"
+
+def render_page(body_html, title, nav_links=None, version_note=SITE_VERSION_NOTE, switcher_html=""):
+    """Wrap a rendered body in the page shell: head, styles, navigation and footer"""
+    
     # Build navigation
     nav_html = ""
     if nav_links:
@@ -1101,6 +2138,15 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
             nav_html += f'<a href="{link_url}">{link_title}</a>'
         nav_html += '</div></div>'
     
+    # Page scripts, only where the body needs them
+    scripts = ""
+    if 'class="virtual-table"' in body_html:
+        scripts += VIRTUAL_TABLE_SCRIPT
+    if 'class="erd-diagram"' in body_html:
+        scripts += ERD_SCRIPT
+    if nav_links:
+        scripts += PAGE_NAV_SCRIPT
+    
     # Build full HTML
     html = f"""<!DOCTYPE html>
 <html lang="en">
@@ -1113,133 +2159,1758 @@ def convert_markdown_to_html(markdown_text, title, nav_links=None):
 <body>
     <div class="container">
         {nav_html}
-        {markdown_text}
+        {body_html}
         <footer>
             <p><strong>Embrix O2X Platform Documentation</strong></p>
-            <p>Version 3.1.9-SNAPSHOT • Last Updated: February 2026</p>
+            <p>{version_note}</p>{switcher_html}
         </footer>
-    </div>
+    </div>{scripts}
 </body>
 </html>"""
     
     return html
 
-def main():
-    """Convert all markdown guides to HTML"""
-    
-    # Navigation links for all pages - will be at top of every page
-    nav_links = [
-        ("Home", "index.html"),
-        ("Guide Index", "guide-index.html"),
-        ("Part 1-5", "guide-index.html"),
-        ("Quick Start", "quick-start.html"),
-        ("Quick Ref", "quick-reference.html"),
-        ("Architecture", "complete-system-overview.html"),
-        ("API Reference", "api-reference.html"),
-        ("Troubleshooting", "troubleshooting-guide.html"),
-    ]
-    
-    # Files to convert - Knowledge Hub content only (no deployment docs)
-    files_to_convert = [
-        # Newcomer Guide Parts (from root and docs/newcomer-4/)
-        ("docs/newcomer-4/NEWCOMER_GUIDE_INDEX.md", "guide-index.html", "📚 Complete Newcomer's Guide Index"),
-        ("docs/newcomer-4/NEWCOMER_GUIDE_PART1_BUSINESS_AND_ARCHITECTURE.md", "part1-business-architecture.html", "Part 1: Business & Architecture"),
-        ("docs/newcomer-4/NEWCOMER_GUIDE_PART2_TECHNICAL_DEEP_DIVE.md", "part2-technical-deep-dive.html", "Part 2: Technical Deep Dive"),
-        ("NEWCOMER_GUIDE_PART3_SERVICES_AND_DEVELOPMENT.md", "part3-services-development.html", "Part 3: Services & Development"),
-        ("docs/newcomer-4/NEWCOMER_GUIDE_PART4_FRONTEND_AND_UI.md", "part4-frontend-ui.html", "Part 4: Frontend Applications & User Interfaces"),
-        ("docs/newcomer-4/NEWCOMER_GUIDE_PART5_MESSAGE_QUEUES_AND_INTEGRATION.md", "part5-message-queues.html", "Part 5: Message Queue Architecture & Integration"),
-        
-        # Quick Start and Reference Guides
-        ("docs/newcomer-4/QUICK_START.md", "quick-start.html", "🎯 Quick Start Guide"),
-        ("docs/newcomer-4/QUICK_REFERENCE_GUIDE.md", "quick-reference.html", "📖 Quick Reference Guide"),
-        
-        # Business and Workflow Guides
-        ("docs/newcomer-4/BUSINESS_SCENARIOS_AND_WORKFLOWS.md", "business-scenarios.html", "💼 Business Scenarios & Workflows"),
-        
-        # Architecture Documentation
-        ("docs/newcomer-4/MULTI_TENANT_ARCHITECTURE.md", "multi-tenant-architecture.html", "🏢 Multi-Tenant Architecture"),
-        ("docs/newcomer-4/DATABASE_ARCHITECTURE_COMPLETE.md", "database-architecture.html", "🗄️ Database Architecture - Complete Guide"),
-        ("docs/newcomer-4/FRONTEND_UI_ARCHITECTURE.md", "frontend-ui-architecture.html", "🎨 Frontend & UI Architecture"),
-        
-        # System Documentation
-        ("docs/newcomer-4/COMPLETE_SYSTEM_OVERVIEW.md", "complete-system-overview.html", "🌐 Complete System Overview"),
-        ("docs/newcomer-4/COMPLETE_SYSTEM_DOCUMENTATION.md", "complete-system-documentation.html", "📋 Complete System Documentation"),
-        ("docs/newcomer-4/COMPLETE_SYSTEM_INVENTORY.md", "complete-system-inventory.html", "📦 Complete System Inventory"),
-        ("docs/newcomer-4/COMPLETE_SERVICES_CATALOG.md", "complete-services-catalog.html", "⚙️ Complete Services Catalog"),
-        
-        # Development Guides
-        ("docs/newcomer-4/API_REFERENCE.md", "api-reference.html", "🔌 API Reference"),
-        ("docs/newcomer-4/FRONTEND_GUIDE.md", "frontend-guide.html", "💻 Frontend Development Guide"),
-        ("docs/newcomer-4/CONTRIBUTING.md", "contributing.html", "🤝 Contributing Guide"),
-        
-        # Troubleshooting and Reference
-        ("docs/newcomer-4/TROUBLESHOOTING_GUIDE.md", "troubleshooting-guide.html", "🔧 Troubleshooting Guide"),
-        ("docs/newcomer-4/GLOSSARY.md", "glossary.html", "📖 Glossary of Terms"),
-    ]
-    
-    # Output directory - docs/newcomer (primary HTML docs location)
-    output_dir = Path("docs/newcomer")
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    converted_count = 0
-    skipped_count = 0
-    
-    for md_file, html_file, title in files_to_convert:
-        md_path = Path(md_file)
-        if not md_path.exists():
-            print(f"Warning: {md_file} not found, skipping...")
-            skipped_count += 1
-            continue
-        
-        print(f"Converting {md_file} -> {html_file}...")
-        
-        with open(md_path, 'r', encoding='utf-8') as f:
-            markdown_content = f.read()
-        
-        html_content = convert_markdown_to_html(markdown_content, title, nav_links)
-        
-        output_path = output_dir / html_file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-        
-        print(f"[OK] Created {output_path}")
-        converted_count += 1
-    
-    # Create index.html with beautiful landing page
-    print("\nCreating index page...")
-    index_content = """# Embrix O2X Knowledge Hub
+def convert_markdown_to_html(markdown_text, title, nav_links=None, asset_dir=None, switcher_html=""):
+    """Convert markdown text to HTML with styling"""
+    return render_page(render_markdown_body(markdown_text, asset_dir), title, nav_links,
+                       switcher_html=switcher_html)
 
-Welcome to the **Embrix O2X Platform Knowledge Hub** - your comprehensive guide to mastering our enterprise-grade Order-to-Cash management system.
+FRAGMENTS_DIR_NAME = "fragments"
+_PAGE_TITLE = re.compile(r'<title>(.*?)</title>', re.DOTALL)
 
----
+def is_page_output(name):
+    """True for full HTML pages, as opposed to fragments and other outputs"""
+    return name.endswith('.html') and FRAGMENTS_DIR_NAME not in name.split('/')[:-1]
 
-## Getting Started
+def fragment_name_for(name):
+    """v3.0/index.html -> v3.0/fragments/index.html (next to the page, as the nav script expects)"""
+    directory, _, page = name.rpartition('/')
+    return f"{directory}/{FRAGMENTS_DIR_NAME}/{page}" if directory else f"{FRAGMENTS_DIR_NAME}/{page}"
 
-New to Embrix O2X? Start with this:
+def _content_span(page_html):
+    """(start, footer start) of the container content below the nav header, or None"""
+    start = page_html.find('<div class="container">')
+    end = page_html.rfind('<footer>')
+    if start < 0 or end < 0:
+        return None
+    start += len('<div class="container">')
+    # The nav header ends where its nav-links div closes
+    if page_html.startswith('<div class="nav-header">', page_html.find('<', start)):
+        nav_end = page_html.find('</div></div>', page_html.find('<div class="nav-links">', start))
+        start = nav_end + len('</div></div>')
+    return start, end
 
-- [Business Scenarios & Workflows](business-scenarios.html) - Real-world use cases and examples
+def page_body(page_html):
+    """The rendered markdown body of a full page, as render_markdown_body returned it, stripped"""
+    span = _content_span(page_html)
+    return page_html[span[0]:span[1]].strip() if span else None
 
----
+def page_fragment(page_html):
+    """Title, container content below the nav header, and page scripts of a full page
 
-## Learning Path
+    Returns None for pages without the standard shell.
+    """
+    title = _PAGE_TITLE.search(page_html)
+    span = _content_span(page_html)
+    if not title or not span:
+        return None
+    start = span[0]
+    end = page_html.index('</footer>', span[1]) + len('</footer>')
+    # Page scripts sit between the container and </body>; the nav script stays resident
+    scripts = page_html[page_html.index('</div>', end) + len('</div>'):page_html.rindex('</body>')]
+    scripts = scripts.replace(PAGE_NAV_SCRIPT, '')
+    return f"<title>{title.group(1)}</title>\n{page_html[start:end].strip()}\n{scripts.strip()}\n"
 
-Follow this recommended sequence to master the platform:
+def serve(input_stream, output_stream, cache_size=4096):
+    """Serve JSON-RPC 2.0 requests (one JSON object per line) until EOF or "shutdown"
 
-1. [Part 1: Business & Architecture](part1-business-architecture.html) - Understand the business domain and high-level architecture
-2. [Part 2: Technical Deep Dive](part2-technical-deep-dive.html) - Explore technical architecture and design patterns
-3. [Part 3: Services & Development](part3-services-development.html) - Master microservices and backend development
-4. [Part 4: Frontend Applications & User Interfaces](part4-frontend-ui.html) - Learn UI architecture and frontend patterns
-5. [Part 5: Message Queue Architecture & Integration](part5-message-queues.html) - Understand async messaging and integration
+    Methods:
+      convert  {"markdown", "title"?, "nav"?: bool, "body_only"?: bool, "asset_dir"?}
+               -> {"html", "blocks", "rendered", "elapsed_ms"}
+      stats    -> render cache statistics
+      shutdown -> stops the server after replying
 
----
+    Rendered blocks are kept in a RenderCache, so after an edit only the
+    changed heading-led blocks are rendered again.
+    """
+    cache = RenderCache(cache_size)
 
-## Architecture Documentation
+    def reply(request_id, result=None, error=None):
+        response = {"jsonrpc": "2.0", "id": request_id}
+        if error is not None:
+            response["error"] = error
+        else:
+            response["result"] = result
+        output_stream.write(json.dumps(response) + "\n")
+        output_stream.flush()
 
-Deep dive into system architecture and design:
+    for raw in input_stream:
+        if not raw.strip():
+            continue
+        try:
+            request = json.loads(raw)
+        except ValueError as e:
+            reply(None, error={"code": -32700, "message": f"Parse error: {e}"})
+            continue
+
+        if not isinstance(request, dict):
+            reply(None, error={"code": -32600, "message": "Invalid Request: expected a JSON object"})
+            continue
+        request_id = request.get("id")
+        method = request.get("method")
+        params = request.get("params")
+        if params is None:
+            params = {}
+        if not isinstance(params, dict):
+            reply(request_id, error={"code": -32602, "message": "params must be an object"})
+            continue
+
+        # One bad message must not take down the editor's long-lived process
+        try:
+            if method == "convert":
+                if not isinstance(params.get("markdown"), str):
+                    reply(request_id, error={"code": -32602, "message": "params.markdown must be a string"})
+                    continue
+                if not isinstance(params.get("asset_dir"), (str, type(None))):
+                    reply(request_id, error={"code": -32602, "message": "params.asset_dir must be a string"})
+                    continue
+                if not isinstance(params.get("title", ""), str):
+                    reply(request_id, error={"code": -32602, "message": "params.title must be a string"})
+                    continue
+                started = time.perf_counter()
+                misses_before = cache.misses
+                # Keep build warnings off the protocol stream
+                with contextlib.redirect_stdout(sys.stderr):
+                    body = render_markdown_body(params["markdown"], params.get("asset_dir"), cache)
+                    if params.get("body_only"):
+                        html = body
+                    else:
+                        nav_links = NAV_LINKS if params.get("nav", True) else None
+                        html = render_page(body, params.get("title", "Preview"), nav_links)
+                reply(request_id, {
+                    "html": html,
+                    "blocks": len(split_markdown_blocks(params["markdown"])),
+                    "rendered": cache.misses - misses_before,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+                })
+            elif method == "stats":
+                reply(request_id, cache.stats())
+            elif method == "shutdown":
+                reply(request_id, None)
+                break
+            else:
+                reply(request_id, error={"code": -32601, "message": f"Method not found: {method}"})
+        except Exception as e:
+            reply(request_id, error={"code": -32603, "message": f"Internal error: {type(e).__name__}: {e}"})
+
+MANIFEST_NAME = "build-manifest.json"
+
+def content_hash(content):
+    """SHA-256 hex digest of text (UTF-8) or bytes"""
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+def write_if_changed(path, content):
+    """Atomically replace path with content unless it already holds the same bytes
+
+    The data goes to a temp file in the same directory and is renamed over
+    the target, so a crash never leaves a truncated page, and unchanged
+    files keep their mtime. Returns True if the file was written.
+    """
+    path = Path(path)
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except FileNotFoundError:
+        pass
+
+    # mkstemp creates 0600 files; keep the existing mode or the umask default instead
+    try:
+        mode = os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        os.chmod(temp_path, mode)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(temp_path)
+        raise
+    return True
+
+def load_manifest(directory):
+    """Read the build manifest from a directory, or an empty one if there is none"""
+    manifest_path = Path(directory) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return {"files": {}}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+_TEMP_FILE = re.compile(r'^\..+\.tmp$')  # write_if_changed's temp files
+
+def published_files(output_dir, outputs=None):
+    """Content hashes of every file under output_dir that a deploy publishes
+
+    Committed pages and assets count as much as generated ones. The
+    manifests themselves and temp files of interrupted writes are skipped.
+    Hashes already known from outputs are not recomputed.
+    """
+    output_dir = Path(output_dir)
+    outputs = outputs or {}
+    files = {}
+    for path in sorted(output_dir.rglob('*')):
+        name = path.relative_to(output_dir).as_posix()
+        if (not path.is_file() or name == MANIFEST_NAME or _TEMP_FILE.match(path.name)
+                or Path(name).match(SHARD_MANIFEST_PATTERN.format('*', '*'))):
+            continue
+        files[name] = outputs.get(name) or content_hash(path.read_bytes())
+    return files
+
+def remove_stale_outputs(output_dir, outputs):
+    """Delete what an earlier build generated and this one did not
+
+    Only files git does not track are deleted, so a committed page is never
+    lost; directories (such as a version subtree) left empty go too.
+    """
+    previous = load_manifest(output_dir)
+    # Manifests before "generated" existed listed only generated files
+    stale = sorted(name for name in previous.get("generated", previous["files"]) if name not in outputs)
+    for name in untracked_files(output_dir, stale):
+        with contextlib.suppress(FileNotFoundError):
+            (Path(output_dir) / name).unlink()
+        for parent in list(Path(name).parents)[:-1]:
+            with contextlib.suppress(OSError):
+                (Path(output_dir) / parent).rmdir()
+
+def write_manifest(output_dir, outputs):
+    """Record the hashes of the published tree and the delta against the previous build
+
+    outputs maps each file this build generated to its content hash. Stale
+    outputs are removed first (see remove_stale_outputs). The manifest
+    lists every published file (see published_files), so deploy_delta can
+    recreate the whole site, and anything no longer in the tree is listed
+    as removed for it to delete on the target. Returns the new manifest.
+    """
+    previous_files = load_manifest(output_dir)["files"]
+    remove_stale_outputs(output_dir, outputs)
+    files = published_files(output_dir, outputs)
+    manifest = {
+        "files": files,
+        "generated": sorted(outputs),
+        "added": sorted(name for name in files if name not in previous_files),
+        "changed": sorted(name for name in files
+                          if name in previous_files and previous_files[name] != files[name]),
+        "removed": sorted(name for name in previous_files if name not in files),
+    }
+    write_if_changed(Path(output_dir) / MANIFEST_NAME, json.dumps(manifest, indent=2) + "\n")
+    return manifest
+
+def untracked_files(directory, names):
+    """The names (relative to directory) that git does not track; none if git cannot tell"""
+    if not names:
+        return []
+    try:
+        tracked = git_output("--literal-pathspecs", "-C", str(directory), "ls-files", "-z", "--", *names).decode('utf-8').split('\0')
+    except (OSError, subprocess.CalledProcessError):
+        return []
+    return [name for name in names if name not in tracked]
+
+def deploy_delta(output_dir, target_dir):
+    """Sync a deploy target to the build output using only manifest differences
+
+    The target keeps a copy of the manifest it was last synced from, so
+    only files whose hash differs are copied and only files the build no
+    longer produces are deleted. A local directory stands in for the real
+    host. Returns (uploaded, deleted) lists of file names.
+    """
+    output_dir = Path(output_dir)
+    target_dir = Path(target_dir)
+    current = load_manifest(output_dir)["files"]
+    deployed = load_manifest(target_dir)["files"]
+
+    uploaded = sorted(name for name, digest in current.items() if deployed.get(name) != digest)
+    deleted = sorted(name for name in deployed if name not in current)
+
+    for name in uploaded:
+        with open(output_dir / name, 'rb') as f:
+            data = f.read()
+        if content_hash(data) != current[name]:
+            raise RuntimeError(f"{output_dir / name} does not match its manifest hash")
+        write_if_changed(target_dir / name, data)
+    for name in deleted:
+        with contextlib.suppress(FileNotFoundError):
+            (target_dir / name).unlink()
+
+    shutil.copyfile(output_dir / MANIFEST_NAME, target_dir / MANIFEST_NAME)
+    return uploaded, deleted
+
+SHARD_MANIFEST_PATTERN = "build-manifest.shard-{}-of-{}.json"
+
+def parse_shard(value):
+    """argparse type for --shard I/N (1-based, as CI node indexes are)"""
+    index, sep, count = value.partition('/')
+    if not (sep and index.isdigit() and count.isdigit() and 1 <= int(index) <= int(count)):
+        raise argparse.ArgumentTypeError("expected I/N with 1 <= I <= N")
+    return int(index), int(count)
+
+def shard_of(html_file, count):
+    """Stable 1-based shard for an output page, independent of page order and machine"""
+    return int(hashlib.sha1(html_file.encode('utf-8')).hexdigest(), 16) % count + 1
+
+def write_shard_manifest(output_dir, shard, options, outputs, page_records):
+    """Record what one shard produced so --merge-shards can finish the site"""
+    index, count = shard
+    partial = {
+        "shard": [index, count],
+        "options": options,
+        "files": dict(sorted(outputs.items())),
+        "pages": page_records,
+    }
+    path = Path(output_dir) / SHARD_MANIFEST_PATTERN.format(index, count)
+    write_if_changed(path, json.dumps(partial, indent=2, sort_keys=True) + "\n")
+    return path
+
+def merge_shard_manifests(output_dir, options):
+    """Combine the partial manifests of every shard; returns (outputs, page_records)
+
+    Raises RuntimeError if a shard is missing, was built with different
+    options, or a listed file does not match its hash. The partial
+    manifests are removed once merged.
+    """
+    output_dir = Path(output_dir)
+    paths = sorted(output_dir.glob(SHARD_MANIFEST_PATTERN.format('*', '*')))
+    if not paths:
+        raise RuntimeError(f"no shard manifests in {output_dir}")
+    partials = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            partials.append(json.load(f))
+    count = partials[0]["shard"][1]
+    found = sorted(partial["shard"][0] for partial in partials if partial["shard"][1] == count)
+    if found != list(range(1, count + 1)) or len(partials) != count:
+        raise RuntimeError(f"expected shards 1..{count} of {count}, found {[p['shard'] for p in partials]}")
+    
+    outputs = {}
+    page_records = {}
+    for partial in partials:
+        if partial["options"] != options:
+            raise RuntimeError(f"shard {partial['shard'][0]}/{count} was built with different options")
+        for name, digest in partial["files"].items():
+            with open(output_dir / name, 'rb') as f:
+                if content_hash(f.read()) != digest:
+                    raise RuntimeError(f"{output_dir / name} does not match shard {partial['shard'][0]}/{count}")
+        outputs.update(partial["files"])
+        page_records.update(partial["pages"])
+    for path in paths:
+        path.unlink()
+    return outputs, page_records
+
+# Cache hints for static hosts, derived from the manifest hashes
+HEADERS_FILE_NAME = "_headers"
+NGINX_SNIPPET_NAME = "nginx-cache.conf"
+SITEMAP_NAME = "sitemap.xml"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+PAGE_CACHE = "public, max-age=300, must-revalidate"
+ASSET_CACHE = "public, max-age=86400"
+_FINGERPRINTED = re.compile(r'\.[0-9a-f]{10}\.\w+$')
+_SITEMAP_ENTRY = re.compile(r'<loc>([^<]*)</loc>\s*<lastmod>([^<]*)</lastmod>')
+
+def cache_policy(name):
+    """Cache-Control for an output: fingerprinted files never change, pages revalidate"""
+    if _FINGERPRINTED.search(name):
+        return IMMUTABLE_CACHE
+    if name.endswith(('.html', '.json', '.xml')):
+        return PAGE_CACHE
+    return ASSET_CACHE
+
+def render_headers_file(outputs):
+    """Netlify / Cloudflare Pages style _headers with content-hash ETags"""
+    lines = []
+    for name, digest in sorted(outputs.items()):
+        paths = [f"/{name}"]
+        if name == "index.html" or name.endswith("/index.html"):
+            paths.insert(0, f"/{name[:-len('index.html')]}")
+        for path in paths:
+            lines += [path, f"  Cache-Control: {cache_policy(name)}"]
+            if cache_policy(name) != IMMUTABLE_CACHE:
+                lines.append(f'  ETag: "{digest[:16]}"')
+    return "\n".join(lines) + "\n"
+
+def render_nginx_snippet():
+    """Location blocks applying the same policies under nginx"""
+    return f"""# Include in the server block that serves docs/newcomer.
+# nginx's own ETags (mtime + size) stay stable: unchanged outputs keep their mtime.
+etag on;
+
+location ~ "\\.[0-9a-f]{{10}}\\.\\w+$" {{
+    add_header Cache-Control "{IMMUTABLE_CACHE}";
+}}
+
+location ~ "(/|\\.html|\\.json|\\.xml)$" {{
+    add_header Cache-Control "{PAGE_CACHE}";
+}}
+"""
+
+def render_sitemap(site_url, pages, previous_hashes, previous_sitemap=""):
+    """sitemap.xml where a page's lastmod moves only when its content hash changes
+
+    pages maps page names to content hashes; dates for unchanged pages are
+    carried over from the previous sitemap.
+    """
+    previous_lastmod = dict(_SITEMAP_ENTRY.findall(previous_sitemap))
+    today = time.strftime('%Y-%m-%d', time.gmtime())
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+    for name, digest in sorted(pages.items()):
+        url = escape(site_url.rstrip('/') + '/' + ('' if name == 'index.html' else name))
+        lastmod = today
+        if previous_hashes.get(name) == digest and url in previous_lastmod:
+            lastmod = previous_lastmod[url]
+        lines.append(f'  <url><loc>{url}</loc><lastmod>{lastmod}</lastmod></url>')
+    lines.append('</urlset>')
+    return "\n".join(lines) + "\n"
+
+# Directories scanned (non-recursively) by --discover; on output-name clashes
+# the earlier root wins
+DISCOVERY_ROOTS = [Path("docs/newcomer-4"), Path("docs"), Path(".")]
+SOURCE_CACHE_FILE = CACHE_DIR / "sources.json"
+
+_script_hash = None
+
+def script_hash():
+    """Hash of this script, read once per process"""
+    global _script_hash
+    if _script_hash is None:
+        with open(__file__, 'rb') as f:
+            _script_hash = content_hash(f.read())
+    return _script_hash
+
+def build_fingerprint(options=None):
+    """Hash of this script and the output-affecting options
+
+    Cached build results are dropped whenever either changes.
+    """
+    return content_hash(script_hash() + json.dumps(options or {}, sort_keys=True))
+
+def output_name_for(md_path):
+    """DEPLOYMENT_GUIDE.md -> deployment-guide.html"""
+    return Path(md_path).stem.lower().replace('_', '-') + ".html"
+
+def title_for(markdown_text, md_path):
+    """Page title from the first heading, falling back to the file name"""
+    match = re.search(r'^#{1,6} +(.+?)[ \t#]*$', _FENCED_CODE.sub('', markdown_text), re.MULTILINE)
+    if match:
+        return re.sub(r'[*`]', '', match.group(1)).strip()
+    return Path(md_path).stem.replace('_', ' ').title()
+
+def scan_markdown_roots(roots):
+    """Stat every *.md file directly under the given roots in one os.scandir pass each
+
+    Returns {posix path: (mtime_ns, size, inode)}. Roots are scanned in parallel.
+    """
+    def scan(root):
+        found = {}
+        try:
+            with os.scandir(root) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.md') and entry.is_file():
+                        st = entry.stat()
+                        found[(Path(root) / entry.name).as_posix()] = (st.st_mtime_ns, st.st_size, entry.inode())
+        except FileNotFoundError:
+            pass
+        return found
+
+    stats = {}
+    with ThreadPoolExecutor() as pool:
+        for found in pool.map(scan, roots):
+            stats.update(found)
+    return stats
+
+def load_source_cache(options=None):
+    """Load the source table; build records are discarded if the converter or options changed"""
+    cache = {"fingerprint": build_fingerprint(options), "sources": {}, "built": {}}
+    if SOURCE_CACHE_FILE.exists():
+        try:
+            with open(SOURCE_CACHE_FILE, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            print(f"Warning: ignoring unreadable cache {SOURCE_CACHE_FILE}")
+            stored = {}
+        cache["sources"] = stored.get("sources", {})
+        if stored.get("fingerprint") == cache["fingerprint"]:
+            cache["built"] = stored.get("built", {})
+    return cache
+
+def save_source_cache(cache):
+    write_if_changed(SOURCE_CACHE_FILE, json.dumps(cache, indent=1, sort_keys=True))
+
+def refresh_source_cache(cache, stats):
+    """Bring cached hashes and titles up to date with fresh stat data
+
+    Only files whose (mtime, size, inode) changed are read, in parallel.
+    Returns the set of paths whose content actually changed.
+    """
+    sources = cache["sources"]
+    stale = [path for path, stamp in stats.items()
+             if sources.get(path, {}).get("stat") != list(stamp)]
+
+    def read(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        return path, content_hash(text), title_for(text, path)
+
+    changed = set()
+    with ThreadPoolExecutor() as pool:
+        for path, digest, title in pool.map(read, stale):
+            if sources.get(path, {}).get("hash") != digest:
+                changed.add(path)
+            sources[path] = {"stat": list(stats[path]), "hash": digest, "title": title}
+
+    for path in [path for path in sources if path not in stats]:
+        del sources[path]
+    return changed
+
+def discover_pages(cache, files_to_convert):
+    """Pages for markdown sources under DISCOVERY_ROOTS that are not listed explicitly"""
+    sources = cache["sources"]
+    listed = {Path(md_file).as_posix() for md_file, _, _ in files_to_convert}
+    # Explicit entries keep their output names even while their source is missing
+    claimed = {html_file for _, html_file, _ in files_to_convert}
+
+    pages = []
+    for root in DISCOVERY_ROOTS:
+        for path in sorted(sources):
+            if Path(path).parent != root or path in listed:
+                continue
+            html_file = output_name_for(path)
+            if html_file in claimed:
+                continue
+            claimed.add(html_file)
+            pages.append((path, html_file, sources[path]["title"]))
+    return pages
+
+# Multi-version builds: sources come straight from git objects, never a checkout
+VERSION_LABEL = re.compile(r'^[A-Za-z0-9][\w.-]*$')
+BODY_CACHE_DIR = CACHE_DIR / "bodies"
+_MARKDOWN_IMAGE_SRC = re.compile(r'!\[[^\]]*\]\(([^)\s]+)')
+
+def parse_version_spec(value):
+    """argparse type for --versions LABEL=REF (a bare REF is its own label)"""
+    label, sep, ref = value.partition('=')
+    if not sep:
+        label, ref = value.replace('/', '-'), value
+    if not ref or not VERSION_LABEL.match(label) or label in (ASSETS_DIR_NAME, FRAGMENTS_DIR_NAME):
+        raise argparse.ArgumentTypeError(f"invalid version {value!r}, expected LABEL=REF such as v3.0=v3.0.0")
+    return label, ref
+
+def git_output(*args, input_data=None):
+    return subprocess.run(("git",) + args, input=input_data, capture_output=True, check=True).stdout
+
+def read_git_tree(ref):
+    """Resolve a ref to (commit, commit date, {path: blob id})"""
+    commit = git_output("rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}").decode().strip()
+    date = git_output("show", "-s", "--format=%cs", commit).decode().strip()
+    blobs = {}
+    for entry in git_output("ls-tree", "-r", "-z", commit).split(b'\0'):
+        meta, _, path = entry.partition(b'\t')
+        if not path:
+            continue
+        _, kind, blob = meta.split()
+        path = path.decode('utf-8')
+        if kind == b'blob':
+            blobs[path] = blob.decode('ascii')
+    return commit, date, blobs
+
+def read_git_blobs(blob_ids, binary=False):
+    """Contents of many blobs (text, or bytes if binary) from a single git cat-file --batch call"""
+    unique = sorted(set(blob_ids))
+    if not unique:
+        return {}
+    data = git_output("cat-file", "--batch", input_data="".join(f"{blob}\n" for blob in unique).encode('ascii'))
+    contents = {}
+    position = 0
+    for blob in unique:
+        header_end = data.index(b'\n', position)
+        size = int(data[position:header_end].split()[2])
+        contents[blob] = data[header_end + 1:header_end + 1 + size]
+        if not binary:
+            contents[blob] = contents[blob].decode('utf-8')
+        position = header_end + 1 + size + 1
+    return contents
+
+def version_pages(blobs, contents, files_to_convert, discover=False):
+    """Pages of one version: explicit entries present in its tree, plus discovered ones"""
+    pages = [(md_file, html_file, title) for md_file, html_file, title in files_to_convert
+             if Path(md_file).as_posix() in blobs]
+    if discover:
+        sources = {path: {"title": title_for(contents[blob], path)} for path, blob in blobs.items()
+                   if Path(path).parent in DISCOVERY_ROOTS and path.endswith('.md')}
+        pages += discover_pages({"sources": sources}, files_to_convert)
+    return pages
+
+def version_images(markdown_text, blobs, asset_dir):
+    """{path under asset_dir: blob id} of the local images a page uses, as of one version"""
+    root = Path(asset_dir).as_posix()
+    images = {}
+    for src in _MARKDOWN_IMAGE_SRC.findall(markdown_text):
+        src = src.split('#')[0].split('?')[0]
+        if not src or re.match(r'^([a-z][a-z0-9+.-]*:|/)', src, re.IGNORECASE):
+            continue
+        path = posixpath.normpath(posixpath.join(root, src))
+        # Only images inside the site; anything else could overwrite the latest version
+        if path.startswith(root + '/') and path in blobs:
+            images[path[len(root) + 1:]] = blobs[path]
+    return images
+
+def version_index_markdown(blobs, pages):
+    """Landing page as that version's copy of this script defined it
+
+    Falls back to a plain list of the version's pages when the script is
+    missing there or defines no landing page.
+    """
+    script_blob = blobs.get(Path(os.path.relpath(__file__)).as_posix())
+    if script_blob:
+        try:
+            tree = ast.parse(read_git_blobs([script_blob])[script_blob])
+        except (SyntaxError, UnicodeDecodeError):
+            tree = None
+        for node in ast.walk(tree) if tree else ():
+            if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant)
+                    and isinstance(node.value.value, str)
+                    and any(isinstance(target, ast.Name) and target.id in ("INDEX_MARKDOWN", "index_content")
+                            for target in node.targets)):
+                return node.value.value
+    return "# Embrix O2X Knowledge Hub\n\n" + "".join(f"- [{title}]({html_file})\n" for _, html_file, title in pages)
+
+class BodyCache:
+    """Rendered page bodies on disk, keyed by source blob id and converter version
+
+    Versions that share an unchanged guide (and the images it shows) render
+    it once; entries not used by a build are dropped by prune().
+    """
+
+    def __init__(self, directory=BODY_CACHE_DIR):
+        self.directory = Path(directory)
+        self.salt = build_fingerprint()
+        self.used = set()
+        self.hits = 0
+        self.misses = 0
+
+    def body(self, blob, markdown_text, asset_dir=None, images=None):
+        # Image blobs are part of the key, as their dimensions end up in the body
+        image_key = json.dumps(sorted((images or {}).items()))
+        path = self.directory / f"{content_hash(f'{self.salt}:{blob}:{image_key}')[:32]}.html"
+        self.used.add(path.name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                body = f.read()
+            self.hits += 1
+            return body
+        except FileNotFoundError:
+            pass
+        body = render_markdown_body(markdown_text, asset_dir)
+        write_if_changed(path, body)
+        self.misses += 1
+        return body
+
+    def prune(self):
+        for path in self.directory.glob('*.html'):
+            if path.name not in self.used:
+                path.unlink()
+
+def version_switcher(html_file, current, sites):
+    """Footer links to the same page in every version (or that version's index)
+
+    sites is a list of (label, page names) with label None for the main
+    site; current is the label of the page being rendered.
+    """
+    prefix = "../" if current else ""
+    links = []
+    for label, names in sites:
+        name = label or "latest"
+        if label == current:
+            links.append(f'<strong>{name}</strong>')
+            continue
+        target = html_file if html_file in names else "index.html"
+        links.append(f'<a href="{prefix}{label + "/" if label else ""}{target}">{name}</a>')
+    return f'\n            <p class="version-switcher">Versions: {" • ".join(links)}</p>'
+
+SERVICES_INDEX_NAME = "services-index.json"
+SERVICES_PAGE_NAME = "services.html"
+
+def markdown_to_text(text):
+    """Strip inline markdown (code, emphasis, links) from a short snippet"""
+    text = re.sub(r'!?\[([^\]]*)\]\([^)]*\)', r'\1', text)
+    text = re.sub(r'[*`]', '', text)
+    return text.strip()
+
+def extract_service_entries(markdown_text):
+    """Collect METADATA_FIELD_PATTERN fields, grouped under the heading they follow
+
+    Each entry records the heading, its anchor on the rendered page, its
+    path of parent headings, a service name (inline code in the heading,
+    else the heading without numbering) and the fields, plus parsed ports
+    and technologies for filtering.
+    """
+    entries = []
+    headings = []
+    anchor = ""
+    ids = HeadingIds()
+    current = None
+    for line in _FENCED_CODE.sub('', markdown_text).split('\n'):
+        heading = re.match(r'^(#{1,6}) (.*?)\s*$', line)
+        if heading:
+            level = len(heading.group(1))
+            anchor = ids.assign(render_heading(line))
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, heading.group(2)))
+            current = None
+            continue
+
+        field = re.match(METADATA_FIELD_PATTERN, line)
+        if not field:
+            continue
+        if current is None:
+            raw_heading = headings[-1][1] if headings else ""
+            code_names = re.findall(r'`([^`]+)`', raw_heading)
+            service = ", ".join(code_names) if code_names else re.sub(
+                r'^[\d.]+\s*', '', markdown_to_text(raw_heading))
+            current = {
+                "service": service,
+                "heading": markdown_to_text(raw_heading),
+                "anchor": anchor,
+                "heading_path": [markdown_to_text(text) for _, text in headings],
+                "fields": {},
+                "ports": [],
+                "technologies": [],
+            }
+            entries.append(current)
+
+        name, value = field.group(1), markdown_to_text(field.group(2))
+        current["fields"][name] = value
+        if name == "Port":
+            current["ports"] = sorted({int(port) for port in re.findall(r'\b\d{2,5}\b', value)})
+        elif name == "Technology":
+            current["technologies"] = [tech.strip() for tech in re.split(r'[,+/]', value) if tech.strip()]
+    return entries
+
+def build_services_index(page_records):
+    """Flatten per-page service entries into one list, in page order"""
+    services = []
+    for html_file, record in page_records.items():
+        for entry in record["services"]:
+            services.append(dict(entry, page=html_file, page_title=record["title"]))
+    return services
+
+def services_by_name(services):
+    """The services index keyed by service, then by page#anchor of the heading"""
+    index = {}
+    for entry in services:
+        key = f"{entry['page']}#{entry['anchor']}" if entry["anchor"] else entry["page"]
+        index.setdefault(entry["service"], {})[key] = entry
+    return index
+
+def write_services_sqlite(services, db_path):
+    """Write the services index to a SQLite file for ad-hoc queries
+
+    Tables: services, fields(service_id, name, value), ports(service_id, port)
+    and technologies(service_id, name), indexed for port/technology lookups.
+    """
+    db_path = Path(db_path)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=db_path.parent, suffix=".tmp")
+    os.close(fd)
+    connection = sqlite3.connect(temp_path)
+    try:
+        connection.executescript("""
+            CREATE TABLE services (id INTEGER PRIMARY KEY, service TEXT, heading TEXT,
+                                   heading_path TEXT, page TEXT, page_title TEXT, anchor TEXT);
+            CREATE TABLE fields (service_id INTEGER REFERENCES services(id), name TEXT, value TEXT);
+            CREATE TABLE ports (service_id INTEGER REFERENCES services(id), port INTEGER);
+            CREATE TABLE technologies (service_id INTEGER REFERENCES services(id), name TEXT);
+            CREATE INDEX ports_by_port ON ports(port);
+            CREATE INDEX technologies_by_name ON technologies(name COLLATE NOCASE);
+        """)
+        for service_id, entry in enumerate(services, 1):
+            connection.execute(
+                "INSERT INTO services VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (service_id, entry["service"], entry["heading"], " > ".join(entry["heading_path"]),
+                 entry["page"], entry["page_title"], entry["anchor"]))
+            connection.executemany("INSERT INTO fields VALUES (?, ?, ?)",
+                                   [(service_id, name, value) for name, value in entry["fields"].items()])
+            connection.executemany("INSERT INTO ports VALUES (?, ?)",
+                                   [(service_id, port) for port in entry["ports"]])
+            connection.executemany("INSERT INTO technologies VALUES (?, ?)",
+                                   [(service_id, tech) for tech in entry["technologies"]])
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(temp_path, db_path)
+
+SERVICES_PAGE_SCRIPT = """
+<script>
+(function () {
+    var services = JSON.parse(document.getElementById('services-data').textContent);
+    var query = document.getElementById('service-query');
+    var port = document.getElementById('service-port');
+    var tech = document.getElementById('service-tech');
+    var rows = document.getElementById('service-rows');
+    var count = document.getElementById('service-count');
+
+    function fill(select, values) {
+        values.sort(function (a, b) { return a - b || String(a).localeCompare(String(b)); });
+        values.forEach(function (value) {
+            var option = document.createElement('option');
+            option.value = option.textContent = value;
+            select.appendChild(option);
+        });
+    }
+    var ports = {}, techs = {};
+    services.forEach(function (s) {
+        s.ports.forEach(function (p) { ports[p] = p; });
+        s.technologies.forEach(function (t) { techs[t] = t; });
+        s.search = (s.service + ' ' + s.heading + ' ' + Object.keys(s.fields).map(function (k) {
+            return s.fields[k];
+        }).join(' ')).toLowerCase();
+    });
+    fill(port, Object.keys(ports).map(Number));
+    fill(tech, Object.keys(techs));
+
+    function cell(tr, text, href) {
+        var td = document.createElement('td');
+        if (href) {
+            var a = document.createElement('a');
+            a.href = href;
+            a.textContent = text;
+            td.appendChild(a);
+        } else {
+            td.textContent = text;
+        }
+        tr.appendChild(td);
+    }
+    function render() {
+        var q = query.value.toLowerCase(), p = port.value, t = tech.value;
+        var matches = services.filter(function (s) {
+            return (!q || s.search.indexOf(q) !== -1)
+                && (!p || s.ports.indexOf(Number(p)) !== -1)
+                && (!t || s.technologies.indexOf(t) !== -1);
+        });
+        rows.textContent = '';
+        matches.forEach(function (s) {
+            var tr = document.createElement('tr');
+            cell(tr, s.service, s.anchor ? s.page + '#' + s.anchor : s.page);
+            cell(tr, s.ports.join(', '));
+            cell(tr, s.fields.Technology || '');
+            cell(tr, s.fields.Location || '');
+            cell(tr, s.page_title);
+            rows.appendChild(tr);
+        });
+        count.textContent = matches.length + ' of ' + services.length + ' entries';
+    }
+    [query, port, tech].forEach(function (el) { el.addEventListener('input', render); });
+    render();
+})();
+</script>
+"""
+
+def render_services_page(services, nav_links=None, switcher_html=""):
+    """Client-side filterable view of the services index (data embedded, works offline)"""
+    # Escape "<" so service text can never close the JSON script element
+    data = json.dumps(services, ensure_ascii=False, sort_keys=True).replace('<', '\\u003c')
+    body = f"""<h1>⚙️ Services Index</h1>
+
+<p>Every service and module described by Location, Port, Technology and similar fields across the guides. Filter by port or technology, or search any field.</p>
+<p>
+    <input id="service-query" type="search" placeholder="Search services..." aria-label="Search services">
+    <select id="service-port" aria-label="Port"><option value="">Any port</option></select>
+    <select id="service-tech" aria-label="Technology"><option value="">Any technology</option></select>
+    <small id="service-count"></small>
+</p>
+<table>
+<thead><tr><th>Service</th><th>Port</th><th>Technology</th><th>Location</th><th>Page</th></tr></thead>
+<tbody id="service-rows"></tbody>
+</table>
+<noscript><p>Enable JavaScript to filter, or use {SERVICES_INDEX_NAME} directly.</p></noscript>
+<script type="application/json" id="services-data">{data}</script>
+{SERVICES_PAGE_SCRIPT}"""
+    return render_page(body, "Services Index", nav_links, switcher_html=switcher_html)
+
+# Single-file edition of the explicit pages, assembled from rendered bodies
+COMBINED_PAGE_NAME = "complete-edition.html"
+COMBINED_TITLE = "Embrix O2X Documentation - Complete Edition"
+COMBINED_HEAD = """<style media="print">
+    .combined-page { break-before: page; }
+    .combined-toc { break-after: page; }
+    .combined-toc a::after { content: none; }
+    pre, table, img { break-inside: avoid; }
+</style>
+"""
+_BODY_HEADING = re.compile(r'<h([1-6]) id="([^"]*)">(.*?)</h\1>', re.DOTALL)
+_LINK_HREF = re.compile(r'(<a\b[^>]*?\bhref=")([^"]*)"')
+
+def combine_page_bodies(pages):
+    """One body from (html_file, title, body_html) entries, with a global TOC
+
+    Heading ids are namespaced by page, links to included pages become
+    in-document anchors, and each page is wrapped in a <section>.
+    """
+    included = {html_file: html_file[:-len('.html')] for html_file, _, _ in pages}
+    toc = ['<nav class="combined-toc">', '<h1>Contents</h1>', '<ol>']
+    sections = []
+    for html_file, title, body in pages:
+        page_id = included[html_file]
+        entries = []
+        
+        def add_id(match):
+            level, heading_id, heading = match.groups()
+            anchor = f"{page_id}--{heading_id}"
+            if level == '2':
+                entries.append(f'<li><a href="#{anchor}">{heading}</a></li>')
+            return f'<h{level} id="{anchor}">{heading}</h{level}>'
+        
+        def rewrite_link(match):
+            target, _, fragment = match.group(2).partition('#')
+            if not target:
+                return f'{match.group(1)}#{page_id}--{fragment}"' if fragment else match.group(0)
+            if target not in included:
+                return match.group(0)
+            anchor = f"{included[target]}--{fragment}" if fragment else f"page-{included[target]}"
+            return f'{match.group(1)}#{anchor}"'
+        
+        def rewrite_rows(match):
+            rows = [[_LINK_HREF.sub(rewrite_link, cell) for cell in row] for row in json.loads(match.group(2))]
+            return match.group(1) + virtual_table_json(rows) + match.group(3)
+        
+        body = _LINK_HREF.sub(rewrite_link, _BODY_HEADING.sub(add_id, body))
+        # Virtual-table rows are JSON, out of reach of the href pattern above
+        body = _VIRTUAL_TABLE_DATA.sub(rewrite_rows, body)
+        sections.append(f'<section class="combined-page" id="page-{page_id}">\n{body}\n</section>')
+        toc.append(f'<li><a href="#page-{page_id}">{title}</a>')
+        if entries:
+            toc.append('<ol>' + ''.join(entries) + '</ol>')
+        toc.append('</li>')
+    toc += ['</ol>', '</nav>']
+    return '\n'.join(toc) + '\n\n' + '\n\n'.join(sections)
+
+def render_combined_page(pages):
+    """Single offline/printable document: one stylesheet, no per-page shells"""
+    page = render_page(combine_page_bodies(pages), COMBINED_TITLE)
+    return page.replace('</head>', COMBINED_HEAD + '</head>', 1)
+
+# Heading-chunked export for retrieval / embedding pipelines
+CORPUS_EXPORT_NAME = "corpus.jsonl"
+_TABLE_RULE = re.compile(r'^\|?[\s:|-]*-[\s:|-]*\|?$')
+
+def section_text(markdown_text):
+    """Plain text of a section body: code blocks, rules and list/quote markers removed"""
+    lines = []
+    for line in _FENCED_CODE.sub('', markdown_text).split('\n'):
+        line = line.strip()
+        if not line or _TABLE_RULE.match(line):
+            continue
+        line = re.sub(r'^(?:>\s*)+|^(?:[-*+]|\d+\.)\s+', '', line)
+        lines.append(markdown_to_text(line.strip('|').replace(' | ', ' \u2022 ')))
+    return '\n'.join(line for line in lines if line)
+
+def export_chunks(html_file, title, markdown_text):
+    """One record per heading-led section, with a hash over everything but the hash
+
+    Anchors are the heading ids render_markdown_body gives the page, so
+    page#anchor links straight to the section.
+    """
+    ids = HeadingIds()
+    headings = []
+    chunks = []
+    for block in split_markdown_blocks(markdown_text):
+        first_line, _, body = block.partition('\n')
+        heading = re.match(r'^(#{1,6}) (.*?)\s*$', first_line)
+        anchor = ""
+        if heading:
+            level = len(heading.group(1))
+            anchor = ids.assign(render_heading(first_line))
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, markdown_to_text(heading.group(2))))
+        else:
+            body = block
+        code = [{"language": match.group(1) or "", "code": match.group(2)}
+                for match in _FENCED_CODE.finditer(body)]
+        text = section_text(body)
+        if not text and not code:
+            continue
+        chunk = {
+            "id": f"{html_file}#{anchor}" if anchor else html_file,
+            "page": html_file,
+            "page_title": title,
+            "heading": headings[-1][1] if heading else title,
+            "heading_path": [text for _, text in headings] if heading else [],
+            "anchor": anchor,
+            "text": text,
+            "code": code,
+            "fields": {match.group(1): markdown_to_text(match.group(2))
+                       for match in re.finditer(METADATA_FIELD_PATTERN, body, re.MULTILINE)},
+        }
+        chunk["hash"] = content_hash(json.dumps(chunk, ensure_ascii=False, sort_keys=True))
+        chunks.append(chunk)
+    return chunks
+
+def render_corpus(chunks):
+    return "".join(json.dumps(chunk, ensure_ascii=False, sort_keys=True) + "\n" for chunk in chunks)
+
+def corpus_hashes(corpus_text):
+    """id -> hash of an export, for counting what changed since the last one"""
+    hashes = {}
+    for line in corpus_text.splitlines():
+        with contextlib.suppress(ValueError, KeyError, TypeError):
+            chunk = json.loads(line)
+            hashes[chunk["id"]] = chunk["hash"]
+    return hashes
+
+# Near-duplicate sections: MinHash signatures over word shingles, with LSH
+# banding so only sections sharing a band are ever compared
+SHINGLE_WORDS = 5
+MINHASH_PERMUTATIONS = 64
+LSH_BANDS = 16  # 4 rows per band: pairs above ~0.5 similarity become candidates
+DUPLICATE_THRESHOLD = 0.8
+MIN_SECTION_SHINGLES = 20
+CANONICAL_SHARE = 0.5
+DUPLICATES_REPORT_FILE = CACHE_DIR / "duplicate-sections.json"
+_MASK64 = (1 << 64) - 1
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+# Fixed seeds keep signatures, and so the report, identical across builds
+_MINHASH_SEEDS = [(_hash64(f"a{i}") | 1, _hash64(f"b{i}")) for i in range(MINHASH_PERMUTATIONS)]
+
+def section_shingles(markdown_text):
+    """Set of overlapping SHINGLE_WORDS-word runs in a section, ignoring case and markup"""
+    words = re.findall(r'\w+', markdown_to_text(markdown_text).lower())
+    return {' '.join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+def minhash_signature(shingles):
+    """MinHash signature; equal positions estimate the Jaccard similarity of two sets"""
+    hashes = [_hash64(shingle) for shingle in shingles]
+    return tuple(min([(a * h + b) & _MASK64 for h in hashes]) for a, b in _MINHASH_SEEDS)
+
+def find_duplicate_sections(page_sources, threshold=DUPLICATE_THRESHOLD):
+    """Near-duplicate sections across pages
+
+    page_sources is a list of (html_file, markdown_text) in page order.
+    Returns (section_counts, duplicates): the number of comparable sections
+    per page, and a list of {"similarity", "sections": [[page, index,
+    heading], [page, index, heading]]} with the earlier page first.
+    """
+    sections = []
+    section_counts = {}
+    for html_file, markdown_text in page_sources:
+        section_counts[html_file] = 0
+        for index, block in enumerate(split_markdown_blocks(markdown_text)):
+            shingles = section_shingles(block)
+            if len(shingles) < MIN_SECTION_SHINGLES:
+                continue
+            heading = markdown_to_text(block.lstrip().split('\n', 1)[0].lstrip('#'))
+            sections.append((html_file, index, heading, minhash_signature(shingles)))
+            section_counts[html_file] += 1
+    
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    buckets = {}
+    for position, section in enumerate(sections):
+        for band in range(LSH_BANDS):
+            buckets.setdefault((band, section[3][band * rows:(band + 1) * rows]), []).append(position)
+    candidates = set()
+    for members in buckets.values():
+        for i, first in enumerate(members):
+            candidates.update((first, second) for second in members[i + 1:])
+    
+    duplicates = []
+    for first, second in sorted(candidates):
+        a, b = sections[first], sections[second]
+        if a[0] == b[0]:
+            continue
+        similarity = sum(x == y for x, y in zip(a[3], b[3])) / MINHASH_PERMUTATIONS
+        if similarity >= threshold:
+            duplicates.append({"similarity": similarity, "sections": [list(a[:3]), list(b[:3])]})
+    return section_counts, duplicates
+
+def canonical_pages(section_counts, duplicates, share=CANONICAL_SHARE):
+    """Map each page whose sections mostly duplicate one earlier page to that page"""
+    shared = {}
+    for duplicate in duplicates:
+        (original, _, _), (copy, index, _) = duplicate["sections"]
+        shared.setdefault(copy, {}).setdefault(original, set()).add(index)
+    canonical = {}
+    for copy in section_counts:
+        originals = shared.get(copy, {})
+        if not originals:
+            continue
+        # Most shared sections wins; dict order (page order) breaks ties
+        original = max(originals, key=lambda page: len(originals[page]))
+        if len(originals[original]) >= share * section_counts[copy]:
+            canonical[copy] = original
+    # Resolve chains so every link points straight at a page that is itself canonical
+    for copy in canonical:
+        while canonical[copy] in canonical:
+            canonical[copy] = canonical[canonical[copy]]
+    return canonical
+
+def report_duplicate_sections(duplicates):
+    """Print near-duplicate section counts per pair of pages"""
+    pairs = {}
+    for duplicate in duplicates:
+        pair = (duplicate["sections"][0][0], duplicate["sections"][1][0])
+        pairs[pair] = pairs.get(pair, 0) + 1
+    for (original, copy), count in sorted(pairs.items(), key=lambda item: (-item[1], item[0])):
+        print(f"  {count:4} sections  {original} ~ {copy}")
+
+ASSETS_DIR_NAME = "assets"
+
+# At-rules whose body is declarations rather than nested rules
+_DECLARATION_AT_RULES = ('@font-face', '@page')
+
+def parse_css_rules(css):
+    """Parse a stylesheet into [(prelude, body)] pairs
+
+    body is the declaration text for style rules and a nested rule list
+    for grouping at-rules such as @media.
+    """
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+
+    def parse_block(pos):
+        rules = []
+        while True:
+            brace = css.find('{', pos)
+            close = css.find('}', pos)
+            if brace == -1 or (close != -1 and close < brace):
+                return rules, (len(css) if close == -1 else close + 1)
+            prelude = css[pos:brace].strip()
+            if prelude.startswith('@') and not prelude.startswith(_DECLARATION_AT_RULES):
+                inner, pos = parse_block(brace + 1)
+                rules.append((prelude, inner))
+            else:
+                end = css.find('}', brace)
+                rules.append((prelude, css[brace + 1:end].strip()))
+                pos = end + 1
+
+    return parse_block(0)[0]
+
+def serialize_css(rules):
+    """Write parsed rules back out, one compact rule per line"""
+    out = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            out.append(f"{prelude}{{\n{serialize_css(body)}\n}}")
+        else:
+            out.append(f"{prelude}{{{' '.join(body.split())}}}")
+    return '\n'.join(out)
+
+class PageUsage(HTMLParser):
+    """Collect the tag names, classes and ids a page actually contains"""
+
+    def __init__(self):
+        super().__init__()
+        self.tags = set()
+        self.classes = set()
+        self.ids = set()
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.add(tag)
+        for name, value in attrs:
+            if name == 'class' and value:
+                self.classes.update(value.split())
+            elif name == 'id' and value:
+                self.ids.add(value)
+
+def selector_matches(selector, usage):
+    """True unless the selector names a tag, class or id the page never uses
+
+    Pseudo-classes, pseudo-elements and attribute filters are ignored, so
+    this keeps every rule that could possibly apply.
+    """
+    simple = re.sub(r'::?[\w-]+(\([^)]*\))?', '', selector)
+    simple = re.sub(r'\[[^\]]*\]', '', simple)
+    for token in re.findall(r'[.#]?-?[A-Za-z_][\w-]*', simple):
+        if token[0] == '.':
+            if token[1:] not in usage.classes:
+                return False
+        elif token[0] == '#':
+            if token[1:] not in usage.ids:
+                return False
+        elif token.lower() not in usage.tags:
+            return False
+    return True
+
+def prune_css_rules(rules, usage):
+    """Keep only the rules (and selectors within a rule) that can match the page"""
+    kept = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            inner = prune_css_rules(body, usage)
+            if inner:
+                kept.append((prelude, inner))
+        elif prelude.startswith('@'):
+            kept.append((prelude, body))
+        else:
+            selectors = [sel.strip() for sel in prelude.split(',') if selector_matches(sel.strip(), usage)]
+            if selectors:
+                kept.append((', '.join(selectors), body))
+    return kept
+
+_STYLE_ELEMENT = re.compile(r'<style>(.*?)</style>', re.DOTALL)
+
+def full_stylesheet():
+    """The complete page stylesheet (contents of the <style> in CSS_TEMPLATE), compacted"""
+    return serialize_css(parse_css_rules(_STYLE_ELEMENT.search(CSS_TEMPLATE).group(1))) + "\n"
+
+def prune_page_css(page_html, stylesheet_href):
+    """Inline only the CSS a page uses and load the full sheet without blocking render
+
+    The full sheet still arrives (preload, then applied on load) so styles
+    for markup created later by scripts keep working. A <noscript> link
+    covers browsers without JavaScript.
+    """
+    match = _STYLE_ELEMENT.search(page_html)
+    if not match:
+        return page_html
+    usage = PageUsage()
+    usage.feed(page_html)
+    critical = serialize_css(prune_css_rules(parse_css_rules(match.group(1)), usage))
+    deferred = (
+        f'<link rel="preload" href="{stylesheet_href}" as="style" '
+        f'onload="this.onload=null;this.rel=\'stylesheet\'">\n'
+        f'<noscript><link rel="stylesheet" href="{stylesheet_href}"></noscript>'
+    )
+    return page_html[:match.start()] + f'<style>\n{critical}\n</style>\n{deferred}' + page_html[match.end():]
+
+def render_blocking_css_bytes(page_html):
+    """Bytes of inline <style> in a page, all of which blocks first render"""
+    return sum(len(css.encode('utf-8'))
+               for css in re.findall(r'<style\b[^>]*>(.*?)</style>', page_html, re.DOTALL))
+
+FONTS_DIR_NAME = f"{ASSETS_DIR_NAME}/fonts"
+
+# System font mode: no downloads at all, tuned native stacks
+SYSTEM_FONT_HEAD = """
+<style id="font-stacks">
+    :root {
+        --font-sans: system-ui, -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', 'Noto Sans', Arial, sans-serif;
+        --font-mono: ui-monospace, SFMono-Regular, 'Cascadia Code', 'SF Mono', Menlo, Consolas, 'Liberation Mono', monospace;
+    }
+</style>
+"""
+
+# File name prefixes (lowercase, alphanumerics only) of the self-hostable families
+LOCAL_FONT_FAMILIES = {"firacode": "Fira Code", "inter": "Inter"}
+FONT_WEIGHTS = {"thin": 100, "extralight": 200, "light": 300, "regular": 400, "book": 400,
+                "medium": 500, "semibold": 600, "bold": 700, "extrabold": 800, "black": 900}
+FONT_FORMATS = {".woff2": "woff2", ".woff": "woff", ".ttf": "truetype", ".otf": "opentype"}
+
+def find_local_fonts(font_dir):
+    """Match font files in font_dir to faces of the families in LOCAL_FONT_FAMILIES
+
+    Faces are recognised by file name, e.g. Inter-SemiBold.woff2,
+    FiraCode-Regular.ttf or Inter-Variable.ttf. When a face exists in
+    several formats the smallest format (woff2 first) wins.
+    """
+    faces = {}
+    for path in sorted(Path(font_dir).iterdir()):
+        if path.suffix.lower() not in FONT_FORMATS:
+            continue
+        key = re.sub(r'[^a-z0-9]', '', path.stem.lower())
+        prefix = next((prefix for prefix in LOCAL_FONT_FAMILIES if key.startswith(prefix)), None)
+        if prefix is None:
+            continue
+        variant = key[len(prefix):]
+        style = 'italic' if 'italic' in variant else 'normal'
+        variant = variant.replace('italic', '')
+        if 'variable' in variant or variant.startswith('vf'):
+            weight = "100 900"
+        else:
+            weight = str(FONT_WEIGHTS.get(variant, 400))
+        face = (LOCAL_FONT_FAMILIES[prefix], weight, style)
+        rank = list(FONT_FORMATS).index(path.suffix.lower())
+        if face not in faces or rank < faces[face][0]:
+            faces[face] = (rank, path)
+
+    fonts = []
+    for (family, weight, style), (_, path) in sorted(faces.items()):
+        # Subsetting re-encodes as woff2 (or woff without brotli); otherwise files are copied
+        if font_subset is not None:
+            extension = ".woff2" if importlib.util.find_spec("brotli") else ".woff"
+        else:
+            extension = path.suffix.lower()
+        name = f"{family.replace(' ', '')}-{weight.replace(' ', '-')}-{style}{extension}"
+        fonts.append({"family": family, "weight": weight, "style": style, "source": path,
+                      "href": f"{FONTS_DIR_NAME}/{name}", "format": FONT_FORMATS[extension]})
+    return fonts
+
+def local_font_head(fonts):
+    """Preload hints and @font-face rules for self-hosted fonts"""
+    lines = []
+    for font in fonts:
+        # Preload only the regular face of each family; other weights load on demand
+        if font["style"] == "normal" and font["weight"] in ("400", "100 900"):
+            lines.append(f'<link rel="preload" href="{font["href"]}" as="font" '
+                         f'type="font/{font["format"].replace("truetype", "ttf").replace("opentype", "otf")}" crossorigin>')
+    lines.append('<style id="font-faces">')
+    for font in fonts:
+        lines.append(f"    @font-face {{ font-family: '{font['family']}'; font-style: {font['style']}; "
+                     f"font-weight: {font['weight']}; font-display: swap; "
+                     f"src: url('{font['href']}') format('{font['format']}'); }}")
+    lines.append('</style>')
+    return "\n" + "\n".join(lines) + "\n"
+
+class PageText(HTMLParser):
+    """Collect every character of visible text (outside <script>/<style>) in a page"""
+
+    def __init__(self):
+        super().__init__()
+        self.chars = set()
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self._skip += 1
+        for name, value in attrs:
+            # Placeholders, alt and title text are rendered in the page fonts too
+            if name in ('alt', 'title', 'placeholder') and value:
+                self.chars.update(value)
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.chars.update(data)
+
+def write_local_fonts(fonts, output_dir, chars):
+    """Write self-hosted fonts, subset to the given characters when fontTools is installed
+
+    Returns {relative path: content hash} for the build manifest.
+    """
+    if font_subset is None:
+        print("Warning: fontTools not installed, copying fonts without subsetting")
+    written = {}
+    # Always keep printable ASCII so script-generated text (filters, counts) renders too
+    codepoints = sorted({ord(ch) for ch in chars | set(string.printable)})
+    for font in fonts:
+        if font_subset is not None:
+            options = font_subset.Options()
+            options.flavor = font["format"] if font["format"] in ("woff2", "woff") else None
+            options.layout_features = ["*"]
+            subsetter = font_subset.Subsetter(options)
+            subsetter.populate(unicodes=codepoints)
+            face = font_subset.load_font(str(font["source"]), options)
+            subsetter.subset(face)
+            buffer = io.BytesIO()
+            font_subset.save_font(face, buffer, options)
+            data = buffer.getvalue()
+        else:
+            data = font["source"].read_bytes()
+        write_if_changed(Path(output_dir) / font["href"], data)
+        written[font["href"]] = content_hash(data)
+        print(f"[OK] Font {font['href']} ({len(data):,} bytes, from {font['source'].stat().st_size:,})")
+    return written
+
+# Page weight / DOM complexity metrics, compared against the previous build
+PAGE_METRICS_FILE = CACHE_DIR / "page-metrics.json"
+PAGE_METRIC_NAMES = ("html_bytes", "gzip_bytes", "dom_nodes", "max_depth",
+                     "tables", "code_blocks", "links", "single_item_lists")
+# Defaults sized well above the current largest page; override with --budget NAME=VALUE
+PAGE_BUDGETS = {"html_bytes": 1_500_000, "gzip_bytes": 250_000, "dom_nodes": 30_000, "max_depth": 32}
+_VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                  'link', 'meta', 'source', 'track', 'wbr'}
+# Start tags that end an open <p>, whose end tag is optional
+_PARAGRAPH_CLOSERS = {'address', 'article', 'aside', 'blockquote', 'details', 'div', 'dl', 'fieldset',
+                      'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+                      'hr', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'table', 'ul'}
+
+class PageMetrics(HTMLParser):
+    """Count DOM nodes, nesting depth, tables, code blocks, links and one-item lists"""
+
+    def __init__(self):
+        super().__init__()
+        self.stack = []
+        self.list_items = []
+        self.counts = dict.fromkeys(PAGE_METRIC_NAMES[2:], 0)
+
+    def handle_starttag(self, tag, attrs):
+        self.counts["dom_nodes"] += 1
+        if tag in _PARAGRAPH_CLOSERS and 'p' in self.stack:
+            self.handle_endtag('p')
+        if tag == 'table':
+            self.counts["tables"] += 1
+        elif tag == 'pre':
+            self.counts["code_blocks"] += 1
+        elif tag == 'a' and dict(attrs).get('href'):
+            self.counts["links"] += 1
+        elif tag == 'li' and self.list_items:
+            self.list_items[-1] += 1
+        if tag in _VOID_ELEMENTS:
+            self.counts["max_depth"] = max(self.counts["max_depth"], len(self.stack) + 1)
+            return
+        self.stack.append(tag)
+        self.counts["max_depth"] = max(self.counts["max_depth"], len(self.stack))
+        if tag in ('ul', 'ol'):
+            self.list_items.append(0)
+
+    def handle_startendtag(self, tag, attrs):
+        self.counts["dom_nodes"] += 1
+        self.counts["max_depth"] = max(self.counts["max_depth"], len(self.stack) + 1)
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        # Close implicitly-ended elements too, as a browser would
+        while self.stack:
+            open_tag = self.stack.pop()
+            if open_tag in ('ul', 'ol') and self.list_items.pop() == 1:
+                self.counts["single_item_lists"] += 1
+            if open_tag == tag:
+                break
+
+def page_metrics(page_html):
+    """Weight and DOM complexity of one generated page"""
+    data = page_html.encode('utf-8')
+    parser = PageMetrics()
+    parser.feed(page_html)
+    parser.close()
+    return {"html_bytes": len(data), "gzip_bytes": len(gzip.compress(data, 9, mtime=0)), **parser.counts}
+
+def parse_budget(value):
+    """argparse type for --budget NAME=VALUE"""
+    name, sep, limit = value.partition('=')
+    if not sep or name not in PAGE_METRIC_NAMES or not limit.isdigit():
+        raise argparse.ArgumentTypeError(
+            f"expected NAME=VALUE with NAME one of {', '.join(PAGE_METRIC_NAMES)}")
+    return name, int(limit)
+
+def report_page_metrics(metrics, previous, budgets):
+    """Print per-page changes since the previous build; returns the budget violations"""
+    changed = 0
+    for name in sorted(metrics):
+        old = previous.get(name)
+        if old is None:
+            print(f"  {name:60} new ({metrics[name]['html_bytes']:,} bytes, {metrics[name]['dom_nodes']:,} nodes)")
+            changed += 1
+            continue
+        deltas = [f"{key} {old.get(key, 0):,} -> {value:,}"
+                  for key, value in metrics[name].items() if old.get(key, 0) != value]
+        if deltas:
+            print(f"  {name:60} {'; '.join(deltas)}")
+            changed += 1
+    for name in sorted(set(previous) - set(metrics)):
+        print(f"  {name:60} removed")
+        changed += 1
+    if not changed:
+        print("  no changes since the previous build")
+    
+    violations = []
+    for name in sorted(metrics):
+        for key, limit in sorted(budgets.items()):
+            if metrics[name][key] > limit:
+                violations.append(f"{name}: {key} {metrics[name][key]:,} exceeds budget {limit:,}")
+    return violations
+
+# Shadow mode: a candidate engine rendered side by side with convert_markdown_to_html
+SHADOW_REPORT_FILE = CACHE_DIR / "shadow-report.json"
+SHADOW_FUZZ_SEED = 20260219
+SHADOW_REPEAT = 3  # timed runs per engine and document; the best one counts
+SHADOW_DIFF_LINES = 12
+_VERBATIM_ELEMENTS = {'pre', 'textarea', 'script', 'style'}
+_BLOCK_ELEMENTS = {'address', 'article', 'aside', 'blockquote', 'body', 'br', 'dd', 'div', 'dl', 'dt',
+                   'figcaption', 'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'head', 'header',
+                   'hr', 'html', 'li', 'link', 'main', 'meta', 'nav', 'ol', 'p', 'pre', 'script', 'section',
+                   'style', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'title', 'tr', 'ul'}
+
+def load_engine(spec):
+    """argparse type for --shadow MODULE:FUNCTION"""
+    module_name, sep, attr = spec.partition(':')
+    if not sep or not module_name or not attr:
+        raise argparse.ArgumentTypeError("expected MODULE:FUNCTION")
+    try:
+        engine = getattr(importlib.import_module(module_name), attr)
+    except (ImportError, AttributeError) as e:
+        raise argparse.ArgumentTypeError(f"cannot load {spec}: {e}")
+    if not callable(engine):
+        raise argparse.ArgumentTypeError(f"{spec} is not callable")
+    return engine
+
+class NormalizedHtml(HTMLParser):
+    """One line per tag or text run, so renderings compare by content, not formatting
+
+    Attributes are sorted, entities decoded and comments dropped. Whitespace
+    is collapsed, and trimmed next to block-level tags; inside <pre> it is
+    kept line by line.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+        self.text = []
+        self.verbatim = 0
+        self.after_block = True
+
+    def flush(self, next_is_block):
+        data = ''.join(self.text)
+        self.text = []
+        if self.verbatim:
+            self.lines.extend(data.split('\n') if data else [])
+            return
+        data = re.sub(r'\s+', ' ', data)
+        if self.after_block:
+            data = data.lstrip()
+        if next_is_block:
+            data = data.rstrip()
+        if data:
+            self.lines.append(data)
+
+    def tag(self, markup, tag):
+        self.flush(tag in _BLOCK_ELEMENTS)
+        self.lines.append(markup)
+        self.after_block = tag in _BLOCK_ELEMENTS
+
+    def handle_starttag(self, tag, attrs):
+        attributes = ''.join(f' {name}' if value is None else f' {name}="{value}"' for name, value in sorted(attrs))
+        self.tag(f'<{tag}{attributes}>', tag)
+        if tag in _VERBATIM_ELEMENTS:
+            self.verbatim += 1
+
+    def handle_startendtag(self, tag, attrs):
+        attributes = ''.join(f' {name}' if value is None else f' {name}="{value}"' for name, value in sorted(attrs))
+        self.tag(f'<{tag}{attributes}>', tag)
+
+    def handle_endtag(self, tag):
+        if tag in _VERBATIM_ELEMENTS and self.verbatim:
+            self.flush(True)
+            self.verbatim -= 1
+        self.tag(f'</{tag}>', tag)
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+    def handle_decl(self, decl):
+        self.tag(f'<!{decl.lower()}>', 'html')
+
+def normalize_html(page_html):
+    parser = NormalizedHtml()
+    parser.feed(page_html)
+    parser.close()
+    parser.flush(True)
+    return parser.lines
+
+def normalized_diff(legacy_html, candidate_html, name):
+    """Unified diff of the normalized renderings; empty when they are equivalent"""
+    return list(difflib.unified_diff(normalize_html(legacy_html), normalize_html(candidate_html),
+                                     f"legacy/{name}", f"candidate/{name}", n=2, lineterm=''))
+
+_FUZZ_WORDS = ["account", "invoice", "O2X", "tenant_id", "GET", "/api/**", "x*y", "a * b", "<tag>",
+               "&amp;", "R&D", '"quoted"', "it's", "🚀", "café", "1.", "|", "#", "\\*", "__init__"]
+
+def fuzz_inline(rng):
+    """A line of words with well-formed and broken inline markup mixed in"""
+    pieces = []
+    for _ in range(rng.randint(2, 12)):
+        word = rng.choice(_FUZZ_WORDS)
+        style = rng.randrange(12)
+        if style == 0:
+            word = f"**{word}**"
+        elif style == 1:
+            word = f"*{word}*"
+        elif style == 2:
+            word = f"`{word}`"
+        elif style == 3:
+            word = f"[{word}](#{rng.choice(_FUZZ_WORDS[:5])})"
+        elif style == 4:
+            word = f"***{word}***"
+        elif style == 5:
+            word = rng.choice(["**", "*", "`", "[", "]("]) + word
+        pieces.append(word)
+    return ' '.join(pieces) + rng.choice(["", "", "", "  "])
+
+def fuzz_markdown(rng, blocks=12):
+    """A random document mixing the block constructs the converter handles"""
+    out = []
+    for _ in range(blocks):
+        kind = rng.randrange(9)
+        if kind == 0:
+            out.append('#' * rng.randint(1, 6) + ' ' + fuzz_inline(rng))
+        elif kind == 1:
+            out.append('\n'.join(fuzz_inline(rng) for _ in range(rng.randint(1, 3))))
+        elif kind == 2:
+            out.append('\n'.join(' ' * rng.choice((0, 0, 2, 4)) + rng.choice(('- ', '* ')) + fuzz_inline(rng)
+                                 for _ in range(rng.randint(1, 6))))
+        elif kind == 3:
+            out.append('\n'.join(f"{i}. {fuzz_inline(rng)}" for i in range(1, rng.randint(2, 6))))
+        elif kind == 4:
+            columns = rng.randint(1, 5)
+            rows = [fuzz_inline(rng).replace('|', '/') for _ in range(columns)]
+            table = ['| ' + ' | '.join(rows) + ' |',
+                     '|' + '|'.join(rng.choice(('---', ':---', ':---:', '---:')) for _ in range(columns)) + '|']
+            for _ in range(rng.randint(0, 8)):
+                table.append('| ' + ' | '.join(rng.choice(_FUZZ_WORDS).replace('|', '/')
+                                                for _ in range(columns)) + ' |')
+            out.append('\n'.join(table))
+        elif kind == 5:
+            lines = '\n'.join(fuzz_inline(rng) for _ in range(rng.randint(0, 4)))
+            out.append(f"```{rng.choice(('', 'java', 'bash', 'json', 'mermaid'))}\n{lines}\n```")
+        elif kind == 6:
+            out.append('> ' + fuzz_inline(rng))
+        elif kind == 7:
+            out.append(rng.choice(('---', '***')))
+        else:
+            field = rng.choice(('Location', 'Purpose', 'Port', 'Technology', 'Key Features'))
+            out.append(f"**{field}:** {fuzz_inline(rng)}")
+    return rng.choice(('\n\n', '\n')).join(out) + '\n'
+
+def shadow_corpus(files_to_convert, fuzz_count):
+    """(name, title, markdown) for every existing page, the landing page and the fuzz documents"""
+    corpus = []
+    for md_file, html_file, title in files_to_convert:
+        if os.path.exists(md_file):
+            corpus.append((html_file, title, Path(md_file).read_text(encoding='utf-8')))
+    corpus.append(("index.html", "Embrix O2X Documentation Portal", INDEX_MARKDOWN))
+    for i in range(fuzz_count):
+        # Seeded per document, so fuzz-007 is the same whatever --fuzz is
+        rng = random.Random(f"{SHADOW_FUZZ_SEED}-{i}")
+        corpus.append((f"fuzz-{i:03}", f"Fuzz {i}", fuzz_markdown(rng, rng.randint(4, 24))))
+    return corpus
+
+def run_engine(engine, markdown_text, title, asset_dir, repeat=SHADOW_REPEAT):
+    """Render with one engine: (html, best time in seconds, peak traced bytes)
+
+    The first call warms shared caches (image sizes, diagrams) and gives the
+    output; timing and tracemalloc runs are separate, as tracing slows
+    everything down.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        html = engine(markdown_text, title, NAV_LINKS, asset_dir=asset_dir)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            engine(markdown_text, title, NAV_LINKS, asset_dir=asset_dir)
+            timings.append(time.perf_counter() - started)
+        tracemalloc.start()
+        try:
+            engine(markdown_text, title, NAV_LINKS, asset_dir=asset_dir)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return html, min(timings), peak
+
+def run_shadow(candidate, corpus, asset_dir):
+    """Compare a candidate engine with the legacy one; True when every rendering matches"""
+    name_of = f"{candidate.__module__}:{getattr(candidate, '__qualname__', candidate)}"
+    print(f"Shadow run: convert_markdown_to_html vs {name_of} on {len(corpus)} documents")
+    records = []
+    for name, title, markdown_text in corpus:
+        legacy_html, legacy_time, legacy_peak = run_engine(convert_markdown_to_html, markdown_text, title, asset_dir)
+        record = {"name": name, "legacy_ms": round(legacy_time * 1000, 3), "legacy_peak": legacy_peak}
+        try:
+            candidate_html, candidate_time, candidate_peak = run_engine(candidate, markdown_text, title, asset_dir)
+        except Exception as e:  # a crashing candidate is a finding, not a reason to stop
+            record.update(identical=False, error=f"{type(e).__name__}: {e}", diff=[])
+        else:
+            diff = normalized_diff(legacy_html, candidate_html, name)
+            record.update(identical=not diff, diff=diff[:200], candidate_ms=round(candidate_time * 1000, 3),
+                          candidate_peak=candidate_peak, speedup=round(legacy_time / max(candidate_time, 1e-9), 3))
+        if not record["identical"] and name.startswith("fuzz-"):
+            record["markdown"] = markdown_text
+        records.append(record)
+
+        # Fuzz documents are only listed when they differ
+        if record["identical"] and name.startswith("fuzz-"):
+            continue
+        status = "[OK]  " if record["identical"] else "[DIFF]"
+        if "error" in record:
+            print(f"{status} {name:40} candidate failed: {record['error']}")
+            continue
+        peak_delta = (record["candidate_peak"] - legacy_peak) // 1024
+        print(f"{status} {name:40} {record['legacy_ms']:8.2f} ms -> {record['candidate_ms']:8.2f} ms "
+              f"{record['speedup']:6.2f}x  peak {legacy_peak // 1024:,} KB {peak_delta:+,} KB")
+        for line in record["diff"][:SHADOW_DIFF_LINES]:
+            print(f"         {line}")
+        if len(record["diff"]) > SHADOW_DIFF_LINES:
+            print(f"         ... {len(record['diff']) - SHADOW_DIFF_LINES} more lines in {SHADOW_REPORT_FILE}")
+
+    CACHE_DIR.mkdir(exist_ok=True)
+    SHADOW_REPORT_FILE.write_text(json.dumps({"candidate": name_of, "fuzz_seed": SHADOW_FUZZ_SEED,
+                                              "repeat": SHADOW_REPEAT, "documents": records}, indent=2),
+                                  encoding='utf-8')
+
+    timed = [record for record in records if "error" not in record]
+    fuzz = [record for record in records if record["name"].startswith("fuzz-")]
+    pages = [record for record in records if not record["name"].startswith("fuzz-")]
+    print(f"\nPages identical: {sum(r['identical'] for r in pages)}/{len(pages)}, "
+          f"fuzz documents identical: {sum(r['identical'] for r in fuzz)}/{len(fuzz)}")
+    if timed:
+        legacy_total = sum(record["legacy_ms"] for record in timed)
+        candidate_total = sum(record["candidate_ms"] for record in timed)
+        speedups = [max(record["speedup"], 1e-3) for record in timed]
+        peak_deltas = [record["candidate_peak"] - record["legacy_peak"] for record in timed]
+        print(f"Total {legacy_total:,.1f} ms -> {candidate_total:,.1f} ms "
+              f"({legacy_total / max(candidate_total, 1e-6):.2f}x), "
+              f"geometric mean speedup {statistics.geometric_mean(speedups):.2f}x "
+              f"(min {min(speedups):.2f}x, max {max(speedups):.2f}x)")
+        print(f"Peak memory delta: median {statistics.median(peak_deltas) // 1024:+,} KB, "
+              f"worst {max(peak_deltas) // 1024:+,} KB")
+
+    mismatched = [record["name"] for record in records if not record["identical"]]
+    if mismatched:
+        print(f"Error: {len(mismatched)} documents render differently, see {SHADOW_REPORT_FILE}")
+        return False
+    print(f"[OK] Candidate renders every document identically; report in {SHADOW_REPORT_FILE}")
+    return True
+
+# Landing page (index.html) of every built version
+INDEX_MARKDOWN = """# Embrix O2X Knowledge Hub
+
+Welcome to the **Embrix O2X Platform Knowledge Hub** - your comprehensive guide to mastering our enterprise-grade Order-to-Cash management system.
+
+---
+
+## Getting Started
+
+New to Embrix O2X? Start with this:
+
+- [Business Scenarios & Workflows](business-scenarios.html) - Real-world use cases and examples
+
+---
+
+## Learning Path
+
+Follow this recommended sequence to master the platform:
+
+1. [Part 1: Business & Architecture](part1-business-architecture.html) - Understand the business domain and high-level architecture
+2. [Part 2: Technical Deep Dive](part2-technical-deep-dive.html) - Explore technical architecture and design patterns
+3. [Part 3: Services & Development](part3-services-development.html) - Master microservices and backend development
+4. [Part 4: Frontend Applications & User Interfaces](part4-frontend-ui.html) - Learn UI architecture and frontend patterns
+5. [Part 5: Message Queue Architecture & Integration](part5-message-queues.html) - Understand async messaging and integration
+
+---
+
+## Architecture Documentation
+
+Deep dive into system architecture and design:
 
 - [Complete System Overview](complete-system-overview.html) - High-level system architecture and components
 - [Multi-Tenant Architecture](multi-tenant-architecture.html) - Multi-tenancy design patterns and implementation
 - [Database Architecture](database-architecture.html) - Data modeling, schema design, and database patterns
+- [Database ERD](database-erd.html) - Entity-relationship diagram of the core data model, generated from the source
 - [Frontend & UI Architecture](frontend-ui-architecture.html) - UI/UX patterns, components, and design system
 
 ---
@@ -1251,6 +3922,7 @@ Comprehensive documentation of all system components:
 - [Complete System Documentation](complete-system-documentation.html) - Full system documentation
 - [Complete System Inventory](complete-system-inventory.html) - All components, services, and dependencies
 - [Complete Services Catalog](complete-services-catalog.html) - Detailed service descriptions and APIs
+- [Services Index](services.html) - Filter every service by port, technology or location
 
 ---
 
@@ -1290,13 +3962,476 @@ Get help when you need it:
 
 Happy learning! Start your journey with the [Complete Newcomer's Guide Index](guide-index.html).
 """
+
+def main():
+    """Convert all markdown guides to HTML"""
+    
+    parser = argparse.ArgumentParser(description="Convert Embrix O2X markdown documentation to HTML")
+    parser.add_argument("--check-inline", action="store_true",
+                        help="run the inline-markup stress corpus with timing checks and exit")
+    parser.add_argument("--shadow", type=load_engine, metavar="MODULE:FUNCTION",
+                        help="render every page, the landing page and a fuzz corpus with this candidate "
+                             "engine as well, report diffs, speedups and memory, and exit")
+    parser.add_argument("--fuzz", type=int, default=100, metavar="N",
+                        help="number of generated fuzz documents for --shadow (default: 100)")
+    parser.add_argument("--serve", action="store_true",
+                        help="serve JSON-RPC conversion requests on stdin/stdout (editor previews)")
+    parser.add_argument("--discover", action="store_true",
+                        help="also convert markdown files found under the discovery roots")
+    parser.add_argument("--force", action="store_true",
+                        help="re-render every page even if its source is unchanged")
+    parser.add_argument("--prune-css", action="store_true",
+                        help="inline only the CSS each page uses and defer the full stylesheet")
+    parser.add_argument("--fonts", choices=("google", "system", "local"), default="google",
+                        help="web fonts from Google (default), native system stacks, or self-hosted from --font-dir")
+    parser.add_argument("--font-dir", metavar="DIR",
+                        help="directory with Inter / Fira Code font files for --fonts local")
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N",
+                        help="convert only the pages in shard I of N and write a partial manifest")
+    parser.add_argument("--merge-shards", action="store_true",
+                        help="finish a sharded build: merge partial manifests, then write the shared pages")
+    parser.add_argument("--combined", action="store_true",
+                        help=f"also write {COMBINED_PAGE_NAME}, all listed guides in one printable file")
+    parser.add_argument("--versions", nargs="+", type=parse_version_spec, default=[], metavar="LABEL=REF",
+                        help="also build these git refs into LABEL/ subtrees with a version switcher")
+    parser.add_argument("--duplicates", action="store_true",
+                        help="report near-duplicate sections across all pages")
+    parser.add_argument("--canonical", action="store_true",
+                        help="with the duplicates report, link mostly-duplicate pages to their original "
+                             "and leave them out of the services index")
+    parser.add_argument("--budget", action="append", type=parse_budget, default=[], metavar="NAME=VALUE",
+                        help="fail the build if any page exceeds this metric (repeatable, 0 disables)")
+    parser.add_argument("--site-url", metavar="URL",
+                        help=f"public base URL of the site; enables {SITEMAP_NAME}")
+    parser.add_argument("--services-db", metavar="PATH",
+                        help="also write the services index to a SQLite file")
+    parser.add_argument("--deploy-to", metavar="DIR",
+                        help="after building, sync only changed files to DIR using the build manifest")
+    parser.add_argument("--cache-size", type=int, default=4096,
+                        help="maximum number of rendered blocks kept by --serve (default: 4096)")
+    args = parser.parse_args()
+    if args.fonts == "local" and not args.font_dir:
+        parser.error("--fonts local requires --font-dir")
+    if args.shard and args.merge_shards:
+        parser.error("--shard and --merge-shards are separate steps")
+    if args.versions and (args.shard or args.merge_shards):
+        parser.error("--versions cannot be combined with sharded builds")
+    if len({label for label, _ in args.versions}) != len(args.versions):
+        parser.error("--versions labels must be unique")
+    
+    if args.check_inline:
+        sys.exit(0 if check_inline_rendering() else 1)
+    
+    if args.serve:
+        serve(sys.stdin, sys.stdout, args.cache_size)
+        return
     
-    index_html = convert_markdown_to_html(index_content, "Embrix O2X Documentation Portal", nav_links)
+    nav_links = NAV_LINKS
+    
+    # Files to convert - Knowledge Hub content only (no deployment docs)
+    files_to_convert = [
+        # Newcomer Guide Parts (from root and docs/newcomer-4/)
+        ("docs/newcomer-4/NEWCOMER_GUIDE_INDEX.md", "guide-index.html", "📚 Complete Newcomer's Guide Index"),
+        ("docs/newcomer-4/NEWCOMER_GUIDE_PART1_BUSINESS_AND_ARCHITECTURE.md", "part1-business-architecture.html", "Part 1: Business & Architecture"),
+        ("docs/newcomer-4/NEWCOMER_GUIDE_PART2_TECHNICAL_DEEP_DIVE.md", "part2-technical-deep-dive.html", "Part 2: Technical Deep Dive"),
+        ("NEWCOMER_GUIDE_PART3_SERVICES_AND_DEVELOPMENT.md", "part3-services-development.html", "Part 3: Services & Development"),
+        ("docs/newcomer-4/NEWCOMER_GUIDE_PART4_FRONTEND_AND_UI.md", "part4-frontend-ui.html", "Part 4: Frontend Applications & User Interfaces"),
+        ("docs/newcomer-4/NEWCOMER_GUIDE_PART5_MESSAGE_QUEUES_AND_INTEGRATION.md", "part5-message-queues.html", "Part 5: Message Queue Architecture & Integration"),
+        
+        # Quick Start and Reference Guides
+        ("docs/newcomer-4/QUICK_START.md", "quick-start.html", "🎯 Quick Start Guide"),
+        ("docs/newcomer-4/QUICK_REFERENCE_GUIDE.md", "quick-reference.html", "📖 Quick Reference Guide"),
+        
+        # Business and Workflow Guides
+        ("docs/newcomer-4/BUSINESS_SCENARIOS_AND_WORKFLOWS.md", "business-scenarios.html", "💼 Business Scenarios & Workflows"),
+        
+        # Architecture Documentation
+        ("docs/newcomer-4/MULTI_TENANT_ARCHITECTURE.md", "multi-tenant-architecture.html", "🏢 Multi-Tenant Architecture"),
+        ("docs/newcomer-4/DATABASE_ARCHITECTURE_COMPLETE.md", "database-architecture.html", "🗄️ Database Architecture - Complete Guide"),
+        ("DATABASE_ERD_OVERVIEW.md", "database-erd.html", "🗺️ Database ERD Overview"),
+        ("docs/newcomer-4/FRONTEND_UI_ARCHITECTURE.md", "frontend-ui-architecture.html", "🎨 Frontend & UI Architecture"),
+        
+        # System Documentation
+        ("docs/newcomer-4/COMPLETE_SYSTEM_OVERVIEW.md", "complete-system-overview.html", "🌐 Complete System Overview"),
+        ("docs/newcomer-4/COMPLETE_SYSTEM_DOCUMENTATION.md", "complete-system-documentation.html", "📋 Complete System Documentation"),
+        ("docs/newcomer-4/COMPLETE_SYSTEM_INVENTORY.md", "complete-system-inventory.html", "📦 Complete System Inventory"),
+        ("docs/newcomer-4/COMPLETE_SERVICES_CATALOG.md", "complete-services-catalog.html", "⚙️ Complete Services Catalog"),
+        
+        # Development Guides
+        ("docs/newcomer-4/API_REFERENCE.md", "api-reference.html", "🔌 API Reference"),
+        ("docs/newcomer-4/FRONTEND_GUIDE.md", "frontend-guide.html", "💻 Frontend Development Guide"),
+        ("docs/newcomer-4/CONTRIBUTING.md", "contributing.html", "🤝 Contributing Guide"),
+        
+        # Troubleshooting and Reference
+        ("docs/newcomer-4/TROUBLESHOOTING_GUIDE.md", "troubleshooting-guide.html", "🔧 Troubleshooting Guide"),
+        ("docs/newcomer-4/GLOSSARY.md", "glossary.html", "📖 Glossary of Terms"),
+    ]
+    
+    # Output directory - docs/newcomer (primary HTML docs location)
+    output_dir = Path("docs/newcomer")
+    
+    # Shadow mode renders in memory and writes only its report
+    if args.shadow:
+        corpus = shadow_corpus(files_to_convert, args.fuzz)
+        sys.exit(0 if run_shadow(args.shadow, corpus, output_dir) else 1)
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Stat all candidate sources in one pass; only changed files get read and hashed.
+    # The discovery roots are scanned even without --discover, so the outputs
+    # that discovery owns are known and not mistaken for stale ones.
+    scan_roots = {Path(md_file).parent for md_file, _, _ in files_to_convert}
+    scan_roots.update(DISCOVERY_ROOTS)
+    # Font mode decides what replaces the Google Fonts links in every page
+    local_fonts = []
+    font_head = None
+    if args.fonts == "system":
+        font_head = SYSTEM_FONT_HEAD
+    elif args.fonts == "local":
+        local_fonts = find_local_fonts(args.font_dir)
+        if not local_fonts:
+            print(f"Warning: no Inter or Fira Code font files in {args.font_dir}, using system fonts")
+            font_head = SYSTEM_FONT_HEAD
+        else:
+            font_head = local_font_head(local_fonts)
+    
+    # Versions to build from git, resolved up front so their commits key the cache
+    versions = []
+    for label, ref in args.versions:
+        try:
+            commit, date, blobs = read_git_tree(ref)
+        except (OSError, subprocess.CalledProcessError):
+            print(f"Error: cannot read git ref {ref!r} for version {label}")
+            sys.exit(1)
+        versions.append({"label": label, "ref": ref, "commit": commit, "date": date, "blobs": blobs})
+    
+    source_cache = load_source_cache({"prune_css": args.prune_css, "font_head": font_head,
+                                      "versions": [[v["label"], v["commit"]] for v in versions]})
+    changed_sources = refresh_source_cache(source_cache, scan_markdown_roots(sorted(scan_roots)))
+    print(f"Scanned {len(source_cache['sources'])} sources, {len(changed_sources)} changed")
+    
+    pages = list(files_to_convert)
+    if args.discover:
+        discovered = discover_pages(source_cache, files_to_convert)
+        print(f"Discovered {len(discovered)} additional sources")
+        pages += discovered
+    
+    # Every version's page set is known before rendering so the footer
+    # switcher can link each page to its counterpart in the other versions
+    sites = []
+    if versions:
+        wanted = {Path(md_file).as_posix() for md_file, _, _ in files_to_convert}
+        contents = read_git_blobs(blob for v in versions for path, blob in v["blobs"].items()
+                                  if path in wanted or (args.discover and Path(path).parent in DISCOVERY_ROOTS
+                                                        and path.endswith('.md')))
+        sites.append((None, {html_file for md_file, html_file, _ in pages
+                             if Path(md_file).as_posix() in source_cache["sources"]}
+                      | {"index.html", SERVICES_PAGE_NAME}))
+        for version in versions:
+            version["pages"] = version_pages(version["blobs"], contents, files_to_convert, args.discover)
+            sites.append((version["label"], {html_file for _, html_file, _ in version["pages"]} | {"index.html"}))
+    
+    def switcher_for(html_file, label=None):
+        return version_switcher(html_file, label, sites) if sites else ""
+    
+    previous_manifest = load_manifest(output_dir)
+    previous_outputs = previous_manifest["files"]
+    converted_count = 0
+    skipped_count = 0
+    outputs = {}
+    page_records = {}
+    bodies = {}
+    
+    # Near-duplicate sections across every page; runs before sharding so all
+    # shards agree on the canonical pages
+    canonical = {}
+    if args.duplicates or args.canonical:
+        page_sources = []
+        for md_file, html_file, _ in pages:
+            if Path(md_file).as_posix() in source_cache["sources"]:
+                with open(md_file, 'r', encoding='utf-8') as f:
+                    page_sources.append((html_file, f.read()))
+        section_counts, duplicates = find_duplicate_sections(page_sources)
+        print(f"\nNear-duplicate sections ({sum(section_counts.values())} sections compared, "
+              f"{len(duplicates)} duplicate pairs):")
+        report_duplicate_sections(duplicates)
+        write_if_changed(DUPLICATES_REPORT_FILE, json.dumps(duplicates, indent=1) + "\n")
+        if args.canonical:
+            canonical = canonical_pages(section_counts, duplicates)
+            for copy, original in sorted(canonical.items()):
+                print(f"  canonical: {copy} -> {original}")
+    
+    # Sharded builds: each shard converts its share of the pages, the merge
+    # step converts nothing and writes the pages shared by the whole site
+    site_pages = list(pages)
+    # Everything that changes a shard's pages; the fingerprint already covers
+    # CSS pruning, fonts and versions
+    shard_options = {"fingerprint": source_cache["fingerprint"], "discover": args.discover,
+                     "duplicates": args.duplicates, "canonical": args.canonical, "canonical_pages": canonical}
+    if args.shard:
+        pages = [page for page in pages if shard_of(page[1], args.shard[1]) == args.shard[0]]
+        print(f"Shard {args.shard[0]}/{args.shard[1]}: {len(pages)} pages")
+    elif args.merge_shards:
+        try:
+            outputs, merged_records = merge_shard_manifests(output_dir, shard_options)
+        except (OSError, RuntimeError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        # Page order drives the services index, so restore the single-build order
+        page_records = {html_file: merged_records[html_file]
+                        for _, html_file, _ in pages if html_file in merged_records}
+        print(f"Merged {len(outputs)} shard outputs")
+        pages = []
+    
+    # Full stylesheet, fingerprinted so it can be cached forever
+    stylesheet_href = None
+    if args.prune_css:
+        stylesheet = full_stylesheet()
+        stylesheet_href = f"{ASSETS_DIR_NAME}/site.{content_hash(stylesheet)[:10]}.css"
+        if not args.shard:
+            outputs[stylesheet_href] = content_hash(stylesheet)
+            write_if_changed(output_dir / stylesheet_href, stylesheet)
+    
+    def emit(name, content):
+        """Post-process, write and record one output file; returns True if it changed"""
+        # Pages in version subtrees reach the shared assets one level up
+        up = "../" * name.count('/')
+        if font_head is not None and is_page_output(name):
+            content = content.replace(GOOGLE_FONT_LINKS, font_head.replace(f"{FONTS_DIR_NAME}/", f"{up}{FONTS_DIR_NAME}/"), 1)
+        if stylesheet_href and is_page_output(name):
+            content = prune_page_css(content, up + stylesheet_href)
+        if name in canonical:
+            content = content.replace('</title>', f'</title>\n    <link rel="canonical" href="{canonical[name]}">', 1)
+        outputs[name] = content_hash(content)
+        # Only pages carrying the nav script ever fetch fragments
+        fragment = page_fragment(content) if is_page_output(name) and PAGE_NAV_SCRIPT in content else None
+        if fragment is not None:
+            fragment_name = fragment_name_for(name)
+            outputs[fragment_name] = content_hash(fragment)
+            write_if_changed(output_dir / fragment_name, fragment)
+        return write_if_changed(output_dir / name, content)
+    
+    for md_file, html_file, title in pages:
+        md_path = Path(md_file)
+        source = source_cache["sources"].get(md_path.as_posix())
+        if source is None:
+            print(f"Warning: {md_file} not found, skipping...")
+            skipped_count += 1
+            continue
+        
+        # Reuse the previous output if neither the source, the images it embeds
+        # (their sizes are in the page) nor the converter changed
+        output_path = output_dir / html_file
+        built = source_cache["built"].get(html_file)
+        if (not args.force and built and built["source"] == source["hash"]
+                and built.get("canonical") == canonical.get(html_file)
+                and "images" in built
+                and {path: image_digest(output_dir / path) for path in built["images"]} == built["images"]
+                and html_file in previous_outputs and output_path.exists()):
+            outputs[html_file] = previous_outputs[html_file]
+            fragment_name = fragment_name_for(html_file)
+            if fragment_name in previous_outputs:
+                outputs[fragment_name] = previous_outputs[fragment_name]
+            page_records[html_file] = built["record"]
+            print(f"[OK] Up to date {output_path}")
+            continue
+        
+        print(f"Converting {md_file} -> {html_file}...")
+        
+        with open(md_path, 'r', encoding='utf-8') as f:
+            markdown_content = f.read()
+        
+        body_html = render_markdown_body(markdown_content, asset_dir=output_dir)
+        html_content = render_page(body_html, title, nav_links, switcher_html=switcher_for(html_file))
+        if args.combined:
+            bodies[html_file] = body_html.strip()
+        
+        if emit(html_file, html_content):
+            print(f"[OK] Created {output_path}")
+        else:
+            print(f"[OK] Unchanged {output_path}")
+        page_records[html_file] = {
+            "title": title,
+            "services": extract_service_entries(markdown_content),
+        }
+        source_cache["built"][html_file] = {"source": source["hash"], "record": page_records[html_file],
+                                             "canonical": canonical.get(html_file),
+                                             "images": image_hashes(markdown_content, output_dir)}
+        converted_count += 1
+    
+    if args.shard:
+        save_image_size_cache()
+        save_source_cache(source_cache)
+        path = write_shard_manifest(output_dir, args.shard, shard_options, outputs, page_records)
+        print(f"\n[OK] Shard {args.shard[0]}/{args.shard[1]}: converted {converted_count} files -> {path}")
+        if skipped_count > 0:
+            print(f"Warning: Skipped {skipped_count} files (not found)")
+        return
+    
+    # Create index.html with beautiful landing page
+    print("\nCreating index page...")
+    index_html = convert_markdown_to_html(INDEX_MARKDOWN, "Embrix O2X Documentation Portal", nav_links,
+                                          asset_dir=output_dir, switcher_html=switcher_for("index.html"))
     index_path = output_dir / "index.html"
-    with open(index_path, 'w', encoding='utf-8') as f:
-        f.write(index_html)
+    if emit("index.html", index_html):
+        print(f"[OK] Created {index_path}")
+    else:
+        print(f"[OK] Unchanged {index_path}")
+    
+    # Combined edition of the explicit pages; bodies of pages skipped as up to
+    # date (or converted by other shards) come back out of their written files
+    if args.combined:
+        started = time.perf_counter()
+        combined_pages = []
+        for _, html_file, title in files_to_convert:
+            if html_file not in outputs:
+                continue
+            if html_file not in bodies:
+                with open(output_dir / html_file, 'r', encoding='utf-8') as f:
+                    bodies[html_file] = page_body(f.read())
+            combined_pages.append((html_file, title, bodies[html_file]))
+        emit(COMBINED_PAGE_NAME, render_combined_page(combined_pages))
+        print(f"[OK] Combined {len(combined_pages)} pages -> {output_dir / COMBINED_PAGE_NAME} "
+              f"({time.perf_counter() - started:.2f}s)")
     
-    print(f"[OK] Created {index_path}")
+    # Older versions from git; bodies are cached by blob id, so guides that did
+    # not change between versions are rendered once
+    if versions:
+        body_cache = BodyCache()
+        for version in versions:
+            label = version["label"]
+            note = f"Version {label} • {version['ref']} @ {version['commit'][:10]} ({version['date']})"
+            rendered = body_cache.misses
+            # Landing page and images come from the version's own tree; images
+            # are written first so their dimensions are read from that version
+            index_markdown = version_index_markdown(version["blobs"], version["pages"])
+            page_images = {html_file: version_images(contents[version["blobs"][Path(md_file).as_posix()]],
+                                                     version["blobs"], output_dir)
+                           for md_file, html_file, _ in version["pages"]}
+            images = version_images(index_markdown, version["blobs"], output_dir)
+            for found in page_images.values():
+                images.update(found)
+            image_data = read_git_blobs(images.values(), binary=True)
+            for name, blob in sorted(images.items()):
+                emit(f"{label}/{name}", image_data[blob])
+            for md_file, html_file, title in version["pages"]:
+                blob = version["blobs"][Path(md_file).as_posix()]
+                body = body_cache.body(blob, contents[blob], output_dir / label, page_images[html_file])
+                emit(f"{label}/{html_file}", render_page(body, title, nav_links, note, switcher_for(html_file, label)))
+            emit(f"{label}/index.html", render_page(render_markdown_body(index_markdown, output_dir / label),
+                                                    "Embrix O2X Documentation Portal", nav_links, note,
+                                                    switcher_for("index.html", label)))
+            print(f"[OK] Version {label}: {len(version['pages'])} pages from {version['ref']} "
+                  f"({body_cache.misses - rendered} rendered, the rest cached)")
+        body_cache.prune()
+    
+    # Service index collected from the metadata fields of every page
+    # Canonicalized copies would only repeat their original's entries
+    services = build_services_index({html_file: record for html_file, record in page_records.items()
+                                     if html_file not in canonical})
+    services_json = json.dumps({"services": services_by_name(services)}, indent=1, ensure_ascii=False, sort_keys=True) + "\n"
+    for name, content in ((SERVICES_INDEX_NAME, services_json),
+                          (SERVICES_PAGE_NAME, render_services_page(services, nav_links, switcher_for(SERVICES_PAGE_NAME)))):
+        emit(name, content)
+    print(f"[OK] Indexed {len(services)} service entries -> {output_dir / SERVICES_INDEX_NAME}")
+    if args.services_db:
+        write_services_sqlite(services, args.services_db)
+        print(f"[OK] Created {args.services_db}")
+    
+    # Section chunks of every page built from a source (canonical copies left out)
+    chunks = []
+    for md_file, html_file, title in site_pages:
+        if (Path(md_file).as_posix() in source_cache["sources"]
+                and html_file in outputs and html_file not in canonical):
+            with open(md_file, 'r', encoding='utf-8') as f:
+                chunks += export_chunks(html_file, title, f.read())
+    try:
+        with open(output_dir / CORPUS_EXPORT_NAME, 'r', encoding='utf-8') as f:
+            previous_chunks = corpus_hashes(f.read())
+    except FileNotFoundError:
+        previous_chunks = {}
+    changed_chunks = sum(previous_chunks.get(chunk["id"]) != chunk["hash"] for chunk in chunks)
+    emit(CORPUS_EXPORT_NAME, render_corpus(chunks))
+    print(f"[OK] Exported {len(chunks)} sections ({changed_chunks} new or changed) -> {output_dir / CORPUS_EXPORT_NAME}")
+    
+    # Self-hosted fonts, subset to the characters used across all written pages
+    if local_fonts:
+        page_text = PageText()
+        for name in sorted(outputs):
+            if is_page_output(name):
+                with open(output_dir / name, 'r', encoding='utf-8') as f:
+                    page_text.feed(f.read())
+        outputs.update(write_local_fonts(local_fonts, output_dir, page_text.chars))
+    
+    # Render-blocking CSS per page, measured on the files as written
+    if args.prune_css:
+        full_bytes = render_blocking_css_bytes(CSS_TEMPLATE)
+        print(f"\nRender-blocking CSS per page (full stylesheet: {full_bytes:,} bytes):")
+        total = 0
+        html_outputs = sorted(name for name in outputs if is_page_output(name))
+        for name in html_outputs:
+            with open(output_dir / name, 'r', encoding='utf-8') as f:
+                inline_bytes = render_blocking_css_bytes(f.read())
+            total += inline_bytes
+            print(f"  {name:60} {inline_bytes:>7,} bytes ({inline_bytes / full_bytes - 1:+.0%})")
+        if html_outputs:
+            print(f"  {'average':60} {total // len(html_outputs):>7,} bytes")
+    
+    # Page weight and DOM complexity, measured on the files as written
+    metrics = {}
+    for name in sorted(outputs):
+        if is_page_output(name):
+            with open(output_dir / name, 'r', encoding='utf-8') as f:
+                metrics[name] = page_metrics(f.read())
+    try:
+        with open(PAGE_METRICS_FILE, 'r', encoding='utf-8') as f:
+            previous_metrics = json.load(f)
+    except (OSError, ValueError):
+        previous_metrics = {}
+    budgets = {**PAGE_BUDGETS, **dict(args.budget)}
+    budgets = {key: limit for key, limit in budgets.items() if limit > 0}
+    print(f"\nPage metrics ({len(metrics)} pages, "
+          f"{sum(m['gzip_bytes'] for m in metrics.values()):,} bytes gzipped in total):")
+    budget_violations = report_page_metrics(metrics, previous_metrics, budgets)
+    write_if_changed(PAGE_METRICS_FILE, json.dumps(metrics, indent=1, sort_keys=True) + "\n")
+    
+    # Discovered pages are still owned by the build when this run skipped discovery
+    if not args.discover:
+        for _, html_file, _ in discover_pages(source_cache, files_to_convert):
+            for name in (html_file, fragment_name_for(html_file)):
+                if (name in previous_manifest.get("generated", previous_outputs) and name not in outputs
+                        and (output_dir / name).exists()):
+                    outputs[name] = previous_outputs[name]
+    
+    # Sitemap of the main site's pages (canonical copies left out), then cache
+    # headers covering every published file including the sitemap
+    remove_stale_outputs(output_dir, outputs)
+    published = published_files(output_dir, outputs)
+    if args.site_url:
+        sitemap_pages = {name: digest for name, digest in published.items()
+                         if is_page_output(name) and '/' not in name and name not in canonical}
+        try:
+            with open(output_dir / SITEMAP_NAME, 'r', encoding='utf-8') as f:
+                previous_sitemap = f.read()
+        except FileNotFoundError:
+            previous_sitemap = ""
+        emit(SITEMAP_NAME, render_sitemap(args.site_url, sitemap_pages, previous_outputs, previous_sitemap))
+        print(f"[OK] Sitemap with {len(sitemap_pages)} pages -> {output_dir / SITEMAP_NAME}")
+    emit(NGINX_SNIPPET_NAME, render_nginx_snippet())
+    published.update(outputs)
+    published.pop(HEADERS_FILE_NAME, None)
+    emit(HEADERS_FILE_NAME, render_headers_file(published))
+    
+    save_image_size_cache()
+    save_source_cache(source_cache)
+    
+    manifest = write_manifest(output_dir, outputs)
+    print(f"\nManifest: {len(manifest['added'])} added, {len(manifest['changed'])} changed, "
+          f"{len(manifest['removed'])} removed")
+    
+    if args.deploy_to:
+        uploaded, deleted = deploy_delta(output_dir, args.deploy_to)
+        print(f"Deployed to {args.deploy_to}: {len(uploaded)} uploaded, {len(deleted)} deleted")
     
     print("\n" + "="*60)
     print(f"SUCCESS! Converted {converted_count} files")
@@ -1305,6 +4440,11 @@ Happy learning! Start your journey with the [Complete Newcomer's Guide Index](gu
     print(f"Output directory: {output_dir.absolute()}")
     print(f"Open: {index_path.absolute()}")
     print("="*60)
+    
+    if budget_violations:
+        for violation in budget_violations:
+            print(f"Error: {violation}")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,169 @@
+"""Tests for convert_to_html.py; run with `python -m pytest` or `python -m unittest`"""
+
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import convert_to_html  # noqa: E402
+
+
+def tree_contents(directory):
+    """{relative posix path: bytes} of every file under directory"""
+    directory = Path(directory)
+    return {path.relative_to(directory).as_posix(): path.read_bytes()
+            for path in sorted(directory.rglob('*')) if path.is_file()}
+
+
+class DeployDeltaTest(unittest.TestCase):
+    """Syncing a build into a local directory that stands in for the deploy host"""
+
+    def setUp(self):
+        self.temp = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.temp)
+
+    def test_sync_matches_output_directory(self):
+        site = self.temp / "site"
+        shutil.copytree(ROOT, site, ignore=shutil.ignore_patterns('.git', '.build-cache', '__pycache__', 'tests'))
+        target = self.temp / "deployed"
+
+        def build():
+            result = subprocess.run([sys.executable, "convert_to_html.py", "--deploy-to", str(target)],
+                                    cwd=site, capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+            return result.stdout
+
+        build()
+        # Committed pages and assets are published too, not just this build's outputs
+        self.assertEqual(tree_contents(site / "docs/newcomer"), tree_contents(target))
+
+        # A rebuild without changes uploads nothing
+        self.assertIn("0 uploaded, 0 deleted", build())
+
+        # Only the edited page and the files derived from it are uploaded
+        source = site / "NEWCOMER_GUIDE_PART3_SERVICES_AND_DEVELOPMENT.md"
+        source.write_text(source.read_text(encoding='utf-8') + "\nOne more paragraph.\n", encoding='utf-8')
+        output = build()
+        self.assertNotIn(" 0 uploaded", output)
+        self.assertEqual(tree_contents(site / "docs/newcomer"), tree_contents(target))
+
+    def test_removed_files_are_deleted_from_target_only(self):
+        output_dir = self.temp / "out"
+        target = self.temp / "deployed"
+        output_dir.mkdir()
+        target.mkdir()
+        (output_dir / "page.html").write_text("<p>page</p>", encoding='utf-8')
+        (output_dir / "committed.png").write_bytes(b"\x89PNG")
+        (output_dir / ".page.html.abc.tmp").write_text("partial", encoding='utf-8')
+        outputs = {"page.html": convert_to_html.content_hash("<p>page</p>")}
+
+        manifest = convert_to_html.write_manifest(output_dir, outputs)
+        self.assertEqual(sorted(manifest["files"]), ["committed.png", "page.html"])
+        self.assertEqual(manifest["generated"], ["page.html"])
+        convert_to_html.deploy_delta(output_dir, target)
+        self.assertEqual(sorted(tree_contents(target)), ["build-manifest.json", "committed.png", "page.html"])
+
+        # The page is gone from the tree: the target loses it, the committed asset stays
+        (output_dir / "page.html").unlink()
+        manifest = convert_to_html.write_manifest(output_dir, {})
+        self.assertEqual(manifest["removed"], ["page.html"])
+        uploaded, deleted = convert_to_html.deploy_delta(output_dir, target)
+        self.assertEqual((uploaded, deleted), ([], ["page.html"]))
+        self.assertEqual(sorted(tree_contents(target)), ["build-manifest.json", "committed.png"])
+
+
+def png(width, height):
+    """Smallest PNG header read_image_size accepts"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IEND', b'')
+
+
+class UpToDateTest(unittest.TestCase):
+    """Pages are skipped only while nothing they embed has changed"""
+
+    def test_replaced_image_rebuilds_page(self):
+        site = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, site)
+        shutil.copytree(ROOT, site, dirs_exist_ok=True,
+                        ignore=shutil.ignore_patterns('.git', '.build-cache', '__pycache__', 'tests'))
+        source = site / "NEWCOMER_GUIDE_PART3_SERVICES_AND_DEVELOPMENT.md"
+        source.write_text(source.read_text(encoding='utf-8') + "\n![shot](shot.png)\n", encoding='utf-8')
+        page = site / "docs/newcomer/part3-services-development.html"
+
+        def build():
+            result = subprocess.run([sys.executable, "convert_to_html.py"], cwd=site, capture_output=True, text=True)
+            self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+            return result.stdout
+
+        (site / "docs/newcomer/shot.png").write_bytes(png(10, 20))
+        build()
+        self.assertIn('width="10" height="20"', page.read_text(encoding='utf-8'))
+        self.assertIn("Up to date docs/newcomer/part3-services-development.html", build())
+
+        (site / "docs/newcomer/shot.png").write_bytes(png(30, 40))
+        self.assertIn("Converting NEWCOMER_GUIDE_PART3_SERVICES_AND_DEVELOPMENT.md", build())
+        self.assertIn('width="30" height="40"', page.read_text(encoding='utf-8'))
+
+
+class InlineRenderingTest(unittest.TestCase):
+    """render_inline output and its growth on pathological lines"""
+
+    def test_expected_output(self):
+        for text, expected in convert_to_html.INLINE_EXPECTED:
+            with self.subTest(text=text):
+                self.assertEqual(convert_to_html.render_inline(text), expected)
+
+    def test_stress_corpus_grows_linearly(self):
+        # Same budget as --check-inline: 4x the input may take at most ~8x as long
+        size, time_budget = 5000, 0.5
+        for name, build in convert_to_html.INLINE_STRESS_CORPUS:
+            with self.subTest(name=name):
+                small, large = (convert_to_html.time_inline(build(n)) for n in (size, size * 4))
+                self.assertLess(large, time_budget)
+                self.assertLessEqual(large, 8 * max(small, 0.001))
+
+
+class HeadingAnchorTest(unittest.TestCase):
+    """Exported anchors are the heading ids on the rendered page"""
+
+    MARKDOWN = ("## See [API](api.html) docs\n\n**Purpose:** Gateway\n\n"
+                "## Logo ![logo](logo.png) `svc`\n\n**Port:** 8080\n\n"
+                "## See [API](api.html) docs\n\nAgain.\n")
+
+    def test_anchors_match_page_ids(self):
+        ids = re.findall(r'<h[1-6] id="([^"]+)"', convert_to_html.render_markdown_body(self.MARKDOWN))
+        self.assertEqual(ids, ["see-api-docs", "logo--svc", "see-api-docs-1"])
+        chunks = convert_to_html.export_chunks("page.html", "Page", self.MARKDOWN)
+        self.assertEqual([chunk["id"] for chunk in chunks], [f"page.html#{anchor}" for anchor in ids])
+        entries = convert_to_html.extract_service_entries(self.MARKDOWN)
+        self.assertEqual([entry["anchor"] for entry in entries], ids[:2])
+
+
+class ErDiagramTest(unittest.TestCase):
+    """Mermaid erDiagram blocks rendered as inline SVG"""
+
+    def test_diagram_without_entities_stays_a_code_block(self):
+        for source in ("erDiagram\n", "erDiagram\n    %% to be filled in\n"):
+            html = convert_to_html.render_markdown_body(f"```mermaid\n{source}```\n")
+            self.assertIn('<pre><code class="language-mermaid">erDiagram', html)
+            self.assertNotIn('<svg', html)
+
+    def test_diagram_with_entities_is_an_svg(self):
+        html = convert_to_html.render_markdown_body(
+            "```mermaid\nerDiagram\n    USER ||--o{ ORDER : places\n```\n")
+        self.assertIn('<svg', html)
+        self.assertNotIn('<pre>', html)
+
+
+if __name__ == '__main__':
+    unittest.main()